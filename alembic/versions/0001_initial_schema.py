@@ -0,0 +1,59 @@
+"""Initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Deployments created before migrations existed already have these tables from
+create_all at startup, so each table is only created when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if "users" not in tables:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("email", sa.String, nullable=False),
+            sa.Column("full_name", sa.String),
+            sa.Column("hashed_password", sa.String, nullable=False),
+            sa.Column("is_active", sa.Boolean),
+            sa.Column("created_at", sa.DateTime),
+        )
+        op.create_index("ix_users_id", "users", ["id"])
+        op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    if "contract_analyses" not in tables:
+        op.create_table(
+            "contract_analyses",
+            sa.Column("id", sa.String, primary_key=True),
+            sa.Column("user_id", sa.Integer, nullable=False),
+            sa.Column("filename", sa.String, nullable=False),
+            sa.Column("contract_type", sa.String, nullable=False),
+            sa.Column("analysis_depth", sa.String, nullable=False),
+            sa.Column("file_size", sa.Integer),
+            sa.Column("summary", sa.Text),
+            sa.Column("risks_json", sa.Text),
+            sa.Column("insights_json", sa.Text),
+            sa.Column("key_terms_json", sa.Text),
+            sa.Column("compliance_score", sa.Float),
+            sa.Column("overall_risk_score", sa.Float),
+            sa.Column("status", sa.String),
+            sa.Column("error_message", sa.Text),
+            sa.Column("created_at", sa.DateTime),
+            sa.Column("completed_at", sa.DateTime),
+        )
+        op.create_index("ix_contract_analyses_id", "contract_analyses", ["id"])
+        op.create_index("ix_contract_analyses_user_id", "contract_analyses", ["user_id"])
+
+def downgrade() -> None:
+    op.drop_table("contract_analyses")
+    op.drop_table("users")
@@ -0,0 +1,86 @@
+"""Stored results, worker queueing and normalized risk/insight tables
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+Adds the contract_analyses columns used by the worker tier, prompt versioning and
+full result storage, plus the analysis_risks and analysis_insights tables. Each
+step is skipped when already applied, since create_all at startup may have
+created the new tables on an existing database.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+NEW_ANALYSIS_COLUMNS = [
+    ("negotiation_points_json", sa.Text),
+    ("missing_clauses_json", sa.Text),
+    ("improvements_json", sa.Text),
+    ("prompt_version", sa.String),
+    ("queue", sa.String),
+    ("stored_path", sa.String),
+]
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    existing = {column["name"] for column in inspector.get_columns("contract_analyses")}
+    for name, column_type in NEW_ANALYSIS_COLUMNS:
+        if name not in existing:
+            op.add_column("contract_analyses", sa.Column(name, column_type))
+
+    if "analysis_risks" not in tables:
+        op.create_table(
+            "analysis_risks",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("analysis_id", sa.String, nullable=False),
+            sa.Column("user_id", sa.Integer, nullable=False),
+            sa.Column("contract_type", sa.String, nullable=False),
+            sa.Column("analysis_depth", sa.String, nullable=False),
+            sa.Column("type", sa.String, nullable=False),
+            sa.Column("type_key", sa.String, nullable=False),
+            sa.Column("severity", sa.String, nullable=False),
+            sa.Column("severity_rank", sa.SmallInteger, nullable=False),
+            sa.Column("confidence", sa.Float),
+            sa.Column("description", sa.Text),
+            sa.Column("recommendation", sa.Text),
+            sa.Column("location", sa.String),
+            sa.Column("compliance_score", sa.Float),
+            sa.Column("overall_risk_score", sa.Float),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+        )
+        op.create_index("ix_analysis_risks_analysis_id", "analysis_risks", ["analysis_id"])
+        op.create_index("ix_analysis_risks_user_created", "analysis_risks", ["user_id", "created_at"])
+        op.create_index("ix_analysis_risks_user_severity_type", "analysis_risks", ["user_id", "severity_rank", "type_key"])
+        op.create_index("ix_analysis_risks_user_contract_type", "analysis_risks", ["user_id", "contract_type"])
+
+    if "analysis_insights" not in tables:
+        op.create_table(
+            "analysis_insights",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("analysis_id", sa.String, nullable=False),
+            sa.Column("user_id", sa.Integer, nullable=False),
+            sa.Column("contract_type", sa.String, nullable=False),
+            sa.Column("category", sa.String, nullable=False),
+            sa.Column("category_key", sa.String, nullable=False),
+            sa.Column("title", sa.String),
+            sa.Column("description", sa.Text),
+            sa.Column("impact", sa.Text),
+            sa.Column("recommendation", sa.Text),
+            sa.Column("created_at", sa.DateTime, nullable=False),
+        )
+        op.create_index("ix_analysis_insights_analysis_id", "analysis_insights", ["analysis_id"])
+        op.create_index("ix_analysis_insights_user_created", "analysis_insights", ["user_id", "created_at"])
+        op.create_index("ix_analysis_insights_user_category", "analysis_insights", ["user_id", "category_key"])
+
+def downgrade() -> None:
+    op.drop_table("analysis_insights")
+    op.drop_table("analysis_risks")
+    for name, _ in reversed(NEW_ANALYSIS_COLUMNS):
+        op.drop_column("contract_analyses", name)
@@ -0,0 +1,135 @@
+"""Packed per-analysis risk vectors for portfolio analytics
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+Adds analytics_codes (dictionary coding for contract and risk types) and
+analysis_risk_vectors (one row per analysis with its risks packed into a NumPy
+structured array), then backfills the vectors from analysis_risks. Table creation is
+skipped when create_all at startup already made them.
+"""
+import calendar
+from itertools import groupby
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH = 1000
+
+# Frozen copy of app.services.risk_analytics.RISK_DTYPE as of this revision
+RISK_DTYPE = np.dtype([
+    ("severity", "i1"),
+    ("type", "<i4"),
+    ("confidence", "<f8"),
+    ("contract_type", "<i4"),
+    ("created_at", "<i8"),
+    ("compliance_score", "<f8"),
+    ("overall_risk_score", "<f8"),
+])
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    tables = sa.inspect(bind).get_table_names()
+
+    if "analytics_codes" not in tables:
+        op.create_table(
+            "analytics_codes",
+            sa.Column("id", sa.Integer, primary_key=True),
+            sa.Column("kind", sa.String, nullable=False),
+            sa.Column("value", sa.String, nullable=False),
+            sa.UniqueConstraint("kind", "value", name="uq_analytics_codes_kind_value"),
+        )
+
+    if "analysis_risk_vectors" not in tables:
+        op.create_table(
+            "analysis_risk_vectors",
+            sa.Column("analysis_id", sa.String, primary_key=True),
+            sa.Column("user_id", sa.Integer, nullable=False),
+            sa.Column("contract_type_code", sa.Integer, nullable=False),
+            sa.Column("created_epoch", sa.BigInteger, nullable=False),
+            sa.Column("risk_count", sa.Integer, nullable=False),
+            sa.Column("risks", sa.LargeBinary, nullable=False),
+        )
+        op.create_index("ix_analysis_risk_vectors_user_created", "analysis_risk_vectors", ["user_id", "created_epoch"])
+
+    _backfill(bind)
+
+def _backfill(bind) -> None:
+    metadata = sa.MetaData()
+    risks = sa.Table("analysis_risks", metadata, autoload_with=bind)
+    codes = sa.Table("analytics_codes", metadata, autoload_with=bind)
+    vectors = sa.Table("analysis_risk_vectors", metadata, autoload_with=bind)
+
+    done = {row[0] for row in bind.execute(sa.select(vectors.c.analysis_id))}
+    known = {(kind, value): code for code, kind, value in bind.execute(sa.select(codes.c.id, codes.c.kind, codes.c.value))}
+
+    def code_for(kind: str, value: str) -> int:
+        if (kind, value) not in known:
+            result = bind.execute(codes.insert().values(kind=kind, value=value))
+            known[(kind, value)] = result.inserted_primary_key[0]
+        return known[(kind, value)]
+
+    rows = bind.execute(
+        sa.select(
+            risks.c.analysis_id,
+            risks.c.user_id,
+            risks.c.contract_type,
+            risks.c.created_at,
+            risks.c.compliance_score,
+            risks.c.overall_risk_score,
+            risks.c.type_key,
+            risks.c.severity_rank,
+            risks.c.confidence,
+        ).order_by(risks.c.analysis_id, risks.c.id)
+    ).all()
+
+    batch = []
+    for analysis_id, group in groupby(rows, key=lambda row: row.analysis_id):
+        if analysis_id in done:
+            continue
+        group = list(group)
+        first = group[0]
+        contract_code = code_for("contract_type", first.contract_type)
+        created_epoch = calendar.timegm(first.created_at.utctimetuple())
+        packed = np.array(
+            [
+                (
+                    row.severity_rank,
+                    code_for("risk_type", row.type_key),
+                    _float(row.confidence),
+                    contract_code,
+                    created_epoch,
+                    _float(row.compliance_score),
+                    _float(row.overall_risk_score),
+                )
+                for row in group
+            ],
+            dtype=RISK_DTYPE
+        )
+        batch.append({
+            "analysis_id": analysis_id,
+            "user_id": first.user_id,
+            "contract_type_code": contract_code,
+            "created_epoch": created_epoch,
+            "risk_count": len(group),
+            "risks": packed.tobytes(),
+        })
+        if len(batch) >= BACKFILL_BATCH:
+            bind.execute(vectors.insert(), batch)
+            batch = []
+    if batch:
+        bind.execute(vectors.insert(), batch)
+
+def _float(value) -> float:
+    return float("nan") if value is None else value
+
+def downgrade() -> None:
+    op.drop_table("analysis_risk_vectors")
+    op.drop_table("analytics_codes")
@@ -11,6 +11,7 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8  # 8 days
     ALGORITHM: str = "HS256"
+    ADMIN_EMAILS: List[str] = []  # from the environment as JSON, e.g. ADMIN_EMAILS='["ops@example.com"]'
     
     # CORS
     ALLOWED_ORIGINS: List[str] = ["*"]  # Configure for production
@@ -21,15 +22,97 @@ class Settings(BaseSettings):
     # Redis (for caching and background tasks)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     
+    # Celery workers (extraction and analysis run off the web nodes when enabled)
+    CELERY_ENABLED: bool = os.getenv("CELERY_ENABLED", "false").lower() == "true"
+    CELERY_BROKER_URL: str = os.getenv("CELERY_BROKER_URL", REDIS_URL)
+    CELERY_RESULT_BACKEND: str = os.getenv("CELERY_RESULT_BACKEND", REDIS_URL)
+    CELERY_STANDARD_QUEUE: str = "analysis_standard"
+    CELERY_HEAVY_QUEUE: str = "analysis_heavy"
+    CELERY_HEAVY_DEPTHS: List[str] = ["deep", "compliance"]
+    CELERY_JOB_LEASE_SECONDS: int = 60  # a claimed job is requeued if its worker stops heartbeating this long
+    CELERY_JOB_HEARTBEAT_SECONDS: int = 15
+    CELERY_JOB_MAX_ATTEMPTS: int = 3  # claims before a job that keeps killing workers is marked failed
+    CELERY_REAP_INTERVAL_SECONDS: int = 30
+    
     # OpenAI Configuration
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4")
+    OPENAI_API_BASE: str = os.getenv("OPENAI_API_BASE", "")  # e.g. the load-test mock server
+    
+    # Model routing (cheap tier first, escalate to OPENAI_MODEL when needed)
+    MODEL_ROUTING_ENABLED: bool = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+    OPENAI_FAST_MODEL: str = os.getenv("OPENAI_FAST_MODEL", "gpt-3.5-turbo-16k")
+    FAST_MODEL_MAX_DOCUMENT_TOKENS: int = 12000  # longer documents (~30+ pages) go to the large model
+    ESCALATION_MIN_CONFIDENCE: float = 0.6
+    ALWAYS_LARGE_DEPTHS: List[str] = ["deep"]
+    ALWAYS_LARGE_CONTRACT_TYPES: List[str] = ["partnership"]  # governance and equity terms need the large model
+    TRIAGE_ENABLED: bool = os.getenv("TRIAGE_ENABLED", "false").lower() == "true"
+    TRIAGE_MAX_CHARS: int = 6000  # start of the contract the fast model screens before routing
+    TRIAGE_TIMEOUT_SECONDS: float = 15.0
+    # Model name prefixes with automatic prompt caching; their shared prompt prefix is
+    # padded to the cacheable minimum. Others (gpt-4, gpt-3.5-turbo) get it unpadded
+    PROMPT_CACHE_MODELS: List[str] = ["gpt-4o", "gpt-4.1", "gpt-5", "o1", "o3", "o4"]
+    
+    # LLM call timeouts and hedging
+    LLM_TIMEOUT_SECONDS: float = 60.0  # used until enough latency samples exist
+    LLM_TIMEOUT_MIN_SECONDS: float = 15.0
+    LLM_TIMEOUT_MAX_SECONDS: float = 120.0
+    LLM_TIMEOUT_P99_MULTIPLIER: float = 2.0
+    LLM_ADAPTIVE_MIN_SAMPLES: int = 20
+    LLM_HEDGING_ENABLED: bool = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = 90.0
+    LLM_HEDGE_MAX_RATE: float = 0.1  # at most this fraction of calls get a backup request
+    
+    # Admission control for /api/upload
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    ADMISSION_EXTRACTION_CONCURRENCY: int = 4
+    ADMISSION_LLM_CONCURRENCY: int = 16
+    ADMISSION_INITIAL_LLM_SECONDS: float = 15.0  # service-time estimate before any calls complete
+    ADMISSION_EWMA_ALPHA: float = 0.2
+    ADMISSION_MAX_UPLOADS: int = 64
+    ADMISSION_INTERACTIVE_MAX_SECONDS: float = 45.0  # stay under nginx's 60s proxy timeout
+    ADMISSION_BATCH_MAX_WAIT_SECONDS: float = 10.0
+    ADMISSION_BATCH_FILE_THRESHOLD: int = 5  # uploads with this many files count as batch
+    # With CELERY_ENABLED, uploads return at once; these bound the wait in the worker queues
+    ADMISSION_QUEUE_WORKERS: int = 4  # worker processes consuming each Celery queue
+    ADMISSION_QUEUE_INTERACTIVE_MAX_WAIT_SECONDS: float = 600.0
+    ADMISSION_QUEUE_BATCH_MAX_WAIT_SECONDS: float = 120.0
+    
+    # Coalescing of identical in-flight analyses
+    COALESCE_ENABLED: bool = os.getenv("COALESCE_ENABLED", "true").lower() == "true"
+    COALESCE_LEASE_SECONDS: int = 12  # renewed while the leader works; a dead leader is noticed this fast
+    COALESCE_WAIT_SECONDS: int = 40  # followers run locally after this, within nginx's 60s proxy timeout
+    COALESCE_RESULT_TTL: int = 60
     
     # File Upload
     MAX_FILE_SIZE: int = 50 * 1024 * 1024  # 50MB
     ALLOWED_EXTENSIONS: List[str] = [".pdf", ".doc", ".docx", ".txt"]
     UPLOAD_DIR: str = "uploads"
     
+    # PDF extraction (first installed backend wins; other installed backends are fallbacks)
+    PDF_BACKENDS: List[str] = ["pypdf2"]  # also: pymupdf, pdfium
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", "0"))  # 0 = one per CPU
+    PDF_PARALLEL_MIN_PAGES: int = 8
+    PDF_PAGE_TIMEOUT_SECONDS: float = 10.0
+    PDF_WORKER_MEMORY_MB: int = 1024
+    
+    # Extraction cache (keyed on the raw upload hash, LRU-evicted past the size budget)
+    EXTRACTION_CACHE_ENABLED: bool = os.getenv("EXTRACTION_CACHE_ENABLED", "true").lower() == "true"
+    EXTRACTION_CACHE_DIR: str = os.path.join(UPLOAD_DIR, "extraction_cache")
+    EXTRACTION_CACHE_MAX_MB: int = 512
+    
+    # Portfolio risk analytics
+    ANALYTICS_CACHE_TTL_SECONDS: int = 60
+    ANALYTICS_CACHE_MAX_ENTRIES: int = 1024
+    ANALYTICS_TOP_TYPES: int = 25
+    
+    # Profiling (off unless armed here or via /api/admin/profiler)
+    PROFILER_DIR: str = os.path.join(UPLOAD_DIR, "profiles")
+    PROFILER_INTERVAL_MS: int = 10
+    PROFILER_SLOW_CAPTURE_ENABLED: bool = os.getenv("PROFILER_SLOW_CAPTURE_ENABLED", "false").lower() == "true"
+    PROFILER_SLOW_REQUEST_MS: int = 30000
+    PROFILER_MAX_CAPTURES: int = 50
+    
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, Float, Boolean
+from sqlalchemy import create_engine, Column, Integer, BigInteger, SmallInteger, String, DateTime, Text, Float, Boolean, LargeBinary, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -36,19 +36,109 @@ class ContractAnalysis(Base):
     risks_json = Column(Text)  # JSON string of risks
     insights_json = Column(Text)  # JSON string of insights
     key_terms_json = Column(Text)  # JSON string of key terms
+    negotiation_points_json = Column(Text)  # JSON string of negotiation points
+    missing_clauses_json = Column(Text)  # JSON string of missing clauses
+    improvements_json = Column(Text)  # JSON string of improvements
     
     # Scores
     compliance_score = Column(Float)
     overall_risk_score = Column(Float)
+    prompt_version = Column(String)
     
     # Status
-    status = Column(String, default="processing")  # processing, completed, failed
+    status = Column(String, default="processing")  # queued, processing, completed, failed
+    queue = Column(String)  # Celery queue the analysis was routed to
+    stored_path = Column(String)  # Raw upload awaiting a worker, removed once processed
     error_message = Column(Text)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime)
 
+class RiskRecord(Base):
+    """One row per RiskItem, denormalized for portfolio analytics"""
+    __tablename__ = "analysis_risks"
+    
+    id = Column(Integer, primary_key=True)
+    analysis_id = Column(String, index=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    contract_type = Column(String, nullable=False)
+    analysis_depth = Column(String, nullable=False)
+    
+    type = Column(String, nullable=False)
+    type_key = Column(String, nullable=False)  # lower-cased type for filtering
+    severity = Column(String, nullable=False)
+    severity_rank = Column(SmallInteger, nullable=False)  # 0=low .. 3=critical
+    confidence = Column(Float)
+    description = Column(Text)
+    recommendation = Column(Text)
+    location = Column(String)
+    
+    # Copied from the parent analysis so analytics never join
+    compliance_score = Column(Float)
+    overall_risk_score = Column(Float)
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_analysis_risks_user_created", "user_id", "created_at"),
+        Index("ix_analysis_risks_user_severity_type", "user_id", "severity_rank", "type_key"),
+        Index("ix_analysis_risks_user_contract_type", "user_id", "contract_type"),
+    )
+
+class AnalyticsCode(Base):
+    """Dictionary coding for the strings stored in RiskVector rows"""
+    __tablename__ = "analytics_codes"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # contract_type or risk_type
+    value = Column(String, nullable=False)
+    
+    __table_args__ = (
+        UniqueConstraint("kind", "value", name="uq_analytics_codes_kind_value"),
+    )
+
+class RiskVector(Base):
+    """One row per analysis with its risks packed into a buffer for portfolio analytics
+    
+    Reading a million RiskRecord rows costs seconds in row objects alone, so
+    analytics reads these instead: one row and one bytes object per analysis. The
+    buffer is a NumPy structured array (risk_analytics.RISK_DTYPE) holding integer
+    codes for the strings, epoch seconds for the timestamp and the scores.
+    """
+    __tablename__ = "analysis_risk_vectors"
+    
+    analysis_id = Column(String, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    contract_type_code = Column(Integer, nullable=False)
+    created_epoch = Column(BigInteger, nullable=False)  # completion time, seconds since epoch (UTC)
+    risk_count = Column(Integer, nullable=False)
+    risks = Column(LargeBinary, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_analysis_risk_vectors_user_created", "user_id", "created_epoch"),
+    )
+
+class InsightRecord(Base):
+    """One row per Insight"""
+    __tablename__ = "analysis_insights"
+    
+    id = Column(Integer, primary_key=True)
+    analysis_id = Column(String, index=True, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    contract_type = Column(String, nullable=False)
+    category = Column(String, nullable=False)
+    category_key = Column(String, nullable=False)
+    title = Column(String)
+    description = Column(Text)
+    impact = Column(Text)
+    recommendation = Column(Text)
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_analysis_insights_user_created", "user_id", "created_at"),
+        Index("ix_analysis_insights_user_category", "user_id", "category_key"),
+    )
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
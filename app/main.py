@@ -1,18 +1,29 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, status
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import os
 import logging
 from typing import List, Optional
+from datetime import datetime
 import asyncio
+import uuid
+import aiofiles
+from sqlalchemy.orm import Session
 
 from .config import settings
-from .database import engine, Base
+from .database import engine, Base, get_db
 from .services.document_processor import DocumentProcessor
 from .services.ai_analyzer import AIAnalyzer
+from .services.analysis_store import AnalysisStore
 from .services.auth import AuthService
+from .services.ai_metrics import ai_metrics
+from .services.prompt_templates import PROMPT_VERSION
+from .services.profiler import profiler, ProfilerMiddleware
+from .services.risk_analytics import RiskFilter, risk_analytics
+from .services.admission import admission
+from .worker import submit_analysis, queue_for_depth, stored_upload_path, remove_stored_upload
 from .models import schemas
 from .utils.exceptions import ContractAnalyzerException
 
@@ -20,7 +31,7 @@ from .utils.exceptions import ContractAnalyzerException
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Create tables
+# Create tables for a fresh database; existing databases are upgraded with `alembic upgrade head`
 Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
@@ -40,6 +51,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Capture a profile and stage timeline for uploads when the profiler is armed
+app.add_middleware(ProfilerMiddleware)
+
 # Security
 security = HTTPBearer()
 auth_service = AuthService()
@@ -47,6 +61,7 @@ auth_service = AuthService()
 # Services
 document_processor = DocumentProcessor()
 ai_analyzer = AIAnalyzer()
+analysis_store = AnalysisStore()
 
 # Static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
@@ -62,7 +77,9 @@ async def upload_contract(
     files: List[UploadFile] = File(...),
     contract_type: str = "general",
     analysis_depth: str = "standard",
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    priority: Optional[str] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
 ):
     """Upload and analyze contract files"""
     try:
@@ -72,69 +89,206 @@ async def upload_contract(
         if not files:
             raise HTTPException(status_code=400, detail="No files uploaded")
         
-        results = []
-        for file in files:
-            # Validate file
-            if not file.filename:
-                continue
-                
-            # Check file size (50MB limit)
-            content = await file.read()
-            if len(content) > 50 * 1024 * 1024:
-                raise HTTPException(status_code=413, detail=f"File {file.filename} too large")
+        # Shed load before spending extraction CPU or LLM tokens
+        if settings.ADMISSION_ENABLED:
+            priority_class = admission.classify(priority, len(files))
+            if settings.CELERY_ENABLED:
+                retry_after = await asyncio.to_thread(
+                    admission.check_queued, priority_class, len(files), queue_for_depth(analysis_depth), user["id"]
+                )
+            else:
+                retry_after = admission.check(priority_class, len(files))
+            if retry_after is not None:
+                raise HTTPException(
+                    status_code=429,
+                    detail=f"Server busy, retry {priority_class} upload in {retry_after}s",
+                    headers={"Retry-After": str(retry_after)}
+                )
+        
+        async with admission.upload():
+            results = await _process_uploads(db, user, files, contract_type, analysis_depth)
+        
+        return schemas.UploadResponse(
+            success=True,
+            message=f"Processed {len(results)} files",
+            results=results
+        )
+        
+    except HTTPException:
+        raise
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Upload error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+async def _process_uploads(
+    db: Session,
+    user: dict,
+    files: List[UploadFile],
+    contract_type: str,
+    analysis_depth: str
+) -> List[dict]:
+    """Queue or analyze each uploaded file, collecting per-file results"""
+    results = []
+    for file in files:
+        # Validate file
+        if not file.filename:
+            continue
             
-            # Process document
+        # Check file size (50MB limit)
+        with profiler.stage("read"):
+            content = await file.read()
+        profiler.annotate_file(file.filename, len(content))
+        if len(content) > 50 * 1024 * 1024:
+            raise HTTPException(status_code=413, detail=f"File {file.filename} too large")
+        
+        analysis_id = str(uuid.uuid4())
+        
+        if settings.CELERY_ENABLED:
+            # Hand the raw file to the worker tier via the shared upload volume
+            path = None
+            row = None
             try:
-                extracted_text = await document_processor.extract_text(content, file.filename)
+                document_processor.validate_file(file.filename, len(content))
+                queue = queue_for_depth(analysis_depth)
+                path = stored_upload_path(analysis_id, file.filename)
+                async with aiofiles.open(path, "wb") as f:
+                    await f.write(content)
                 
-                # Analyze with AI
-                analysis = await ai_analyzer.analyze_contract(
-                    text=extracted_text,
+                row = analysis_store.create_pending(
+                    db,
+                    analysis_id=analysis_id,
+                    user_id=user["id"],
+                    filename=file.filename,
                     contract_type=contract_type,
                     analysis_depth=analysis_depth,
-                    filename=file.filename
+                    file_size=len(content),
+                    status="queued",
+                    queue=queue,
+                    stored_path=path
                 )
+                submit_analysis(queue, user["id"], analysis_id)
                 
                 results.append({
                     "filename": file.filename,
-                    "status": "success",
-                    "analysis": analysis
+                    "status": "queued",
+                    "analysis_id": analysis_id
                 })
-                
             except Exception as e:
-                logger.error(f"Error processing {file.filename}: {str(e)}")
+                logger.error(f"Error queueing {file.filename}: {str(e)}")
+                # Never leave a queued row that no worker will pick up
+                if row is not None:
+                    analysis_store.mark_failed(db, row, str(e))
+                else:
+                    db.rollback()
+                remove_stored_upload(path)
                 results.append({
                     "filename": file.filename,
                     "status": "error",
                     "error": str(e)
                 })
+            continue
         
-        return schemas.UploadResponse(
-            success=True,
-            message=f"Processed {len(results)} files",
-            results=results
+        # Process document
+        row = analysis_store.create_pending(
+            db,
+            analysis_id=analysis_id,
+            user_id=user["id"],
+            filename=file.filename,
+            contract_type=contract_type,
+            analysis_depth=analysis_depth,
+            file_size=len(content)
         )
-        
-    except ContractAnalyzerException as e:
-        raise HTTPException(status_code=e.status_code, detail=e.message)
-    except Exception as e:
-        logger.error(f"Upload error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+        try:
+            with profiler.stage("extract"):
+                async with admission.extraction.slot():
+                    document = await document_processor.extract_document(content, file.filename)
+            
+            # Analyze with AI
+            with profiler.stage("analyze"):
+                analysis = await ai_analyzer.analyze_contract(
+                    text=document.text,
+                    contract_type=contract_type,
+                    analysis_depth=analysis_depth,
+                    filename=file.filename
+                )
+            analysis = document_processor.annotate_locations(analysis, document)
+            analysis = analysis.model_copy(update={"id": analysis_id})
+            with profiler.stage("persist"):
+                analysis_store.save_result(db, row, analysis)
+            
+            results.append({
+                "filename": file.filename,
+                "status": "success",
+                "analysis_id": analysis_id,
+                "analysis": analysis
+            })
+            
+        except Exception as e:
+            logger.error(f"Error processing {file.filename}: {str(e)}")
+            analysis_store.mark_failed(db, row, str(e))
+            results.append({
+                "filename": file.filename,
+                "status": "error",
+                "analysis_id": analysis_id,
+                "error": str(e)
+            })
+
+    return results
 
 @app.get("/api/analysis/{analysis_id}", response_model=schemas.AnalysisResult)
 async def get_analysis(
     analysis_id: str,
-    credentials: HTTPAuthorizationCredentials = Depends(security)
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
 ):
     """Get analysis results by ID"""
     try:
         user = await auth_service.get_current_user(credentials.credentials)
-        # TODO: Implement database retrieval
-        raise HTTPException(status_code=404, detail="Analysis not found")
+        row = analysis_store.get(db, analysis_id, user["id"])
+        if row is None:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        if row.status != "completed":
+            raise HTTPException(status_code=409, detail=f"Analysis is {row.status}")
+        return analysis_store.to_result(row)
+    except HTTPException:
+        raise
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
     except Exception as e:
         logger.error(f"Get analysis error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/analysis/{analysis_id}/status", response_model=schemas.AnalysisStatus)
+async def get_analysis_status(
+    analysis_id: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """Get the processing status of a queued analysis"""
+    try:
+        user = await auth_service.get_current_user(credentials.credentials)
+        row = analysis_store.get(db, analysis_id, user["id"])
+        if row is None:
+            raise HTTPException(status_code=404, detail="Analysis not found")
+        return schemas.AnalysisStatus(
+            id=row.id,
+            filename=row.filename,
+            status=row.status,
+            queue=row.queue,
+            error_message=row.error_message,
+            created_at=row.created_at,
+            completed_at=row.completed_at
+        )
+    except HTTPException:
+        raise
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Get analysis status error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.post("/api/auth/login", response_model=schemas.TokenResponse)
 async def login(credentials: schemas.LoginRequest):
     """Authenticate user and return JWT token"""
@@ -163,10 +317,124 @@ async def get_dashboard_stats(
         logger.error(f"Dashboard stats error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.get("/api/metrics/ai")
+async def get_ai_metrics(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Per-route LLM latency, cost and escalation rate for this process"""
+    try:
+        await auth_service.get_current_user(credentials.credentials)
+        return {"prompt_version": PROMPT_VERSION, "routes": ai_metrics.snapshot()}
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+@app.get("/api/metrics/extraction")
+async def get_extraction_metrics(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Per-backend PDF extraction throughput and extraction cache usage for this process"""
+    try:
+        await auth_service.get_current_user(credentials.credentials)
+        cache = document_processor.cache
+        return {
+            "backend_order": document_processor.pdf_extractor.backend_order,
+            "backends": document_processor.pdf_extractor.stats(),
+            "cache": cache.stats() if cache else None
+        }
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+@app.get("/api/admin/profiler")
+async def get_profiler_status(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Current profiler configuration and stored captures"""
+    try:
+        await auth_service.get_current_admin(credentials.credentials)
+        return {"status": profiler.status(), "captures": profiler.list_captures()}
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+@app.post("/api/admin/profiler")
+async def configure_profiler(
+    config: schemas.ProfilerConfigRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Arm slow-upload capture and/or open a filtered profiling window"""
+    try:
+        await auth_service.get_current_admin(credentials.credentials)
+        profiler.configure(
+            slow_capture=config.slow_capture,
+            slow_threshold_ms=config.slow_threshold_ms,
+            window_seconds=config.window_seconds,
+            extensions=config.extensions,
+            min_size_mb=config.min_size_mb
+        )
+        return profiler.status()
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+@app.delete("/api/admin/profiler")
+async def disable_profiler(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Turn all profiling off"""
+    try:
+        await auth_service.get_current_admin(credentials.credentials)
+        profiler.disable()
+        return profiler.status()
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+
+@app.get("/api/admin/profiler/captures/{name}")
+async def download_profile_capture(
+    name: str,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """Download a .collapsed stack file or .json timeline"""
+    try:
+        await auth_service.get_current_admin(credentials.credentials)
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    path = profiler.capture_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    return FileResponse(path, filename=name)
+
+@app.get("/api/analytics/risks", response_model=schemas.RiskAnalyticsResponse)
+async def get_risk_analytics(
+    contract_type: Optional[str] = None,
+    risk_type: Optional[str] = None,
+    min_severity: Optional[schemas.RiskLevel] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    bucket: str = "week",
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+):
+    """Portfolio risk distribution, percentiles and trend for the current user"""
+    try:
+        user = await auth_service.get_current_user(credentials.credentials)
+        risk_filter = RiskFilter(
+            user_id=user["id"],
+            contract_type=contract_type,
+            risk_type=risk_type,
+            min_severity=min_severity.value if min_severity else None,
+            start=start,
+            end=end,
+            bucket=bucket
+        )
+        return risk_analytics.summarize(db, risk_filter)
+    except ContractAnalyzerException as e:
+        raise HTTPException(status_code=e.status_code, detail=e.message)
+    except Exception as e:
+        logger.error(f"Risk analytics error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "version": "1.0.0"}
+    return {"status": "healthy", "version": "1.0.0", "admission": admission.status()}
 
 @app.exception_handler(ContractAnalyzerException)
 async def contract_analyzer_exception_handler(request, exc: ContractAnalyzerException):
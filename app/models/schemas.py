@@ -32,6 +32,13 @@ class UploadRequest(BaseModel):
     contract_type: ContractType = ContractType.GENERAL
     analysis_depth: AnalysisDepth = AnalysisDepth.STANDARD
 
+class ProfilerConfigRequest(BaseModel):
+    slow_capture: Optional[bool] = None
+    slow_threshold_ms: Optional[int] = None
+    window_seconds: Optional[int] = None
+    extensions: Optional[List[str]] = None
+    min_size_mb: float = 0.0
+
 # Response Models
 class TokenResponse(BaseModel):
     access_token: str
@@ -77,10 +84,13 @@ class AnalysisResult(BaseModel):
     negotiation_points: List[str]
     missing_clauses: List[str]
     improvements: List[str]
+    
+    prompt_version: Optional[str] = None
 
 class FileAnalysisResult(BaseModel):
     filename: str
     status: str
+    analysis_id: Optional[str] = None
     analysis: Optional[AnalysisResult] = None
     error: Optional[str] = None
 
@@ -89,6 +99,27 @@ class UploadResponse(BaseModel):
     message: str
     results: List[FileAnalysisResult]
 
+class AnalysisStatus(BaseModel):
+    id: str
+    filename: str
+    status: str
+    queue: Optional[str] = None
+    error_message: Optional[str] = None
+    created_at: datetime
+    completed_at: Optional[datetime] = None
+
+class RiskAnalyticsResponse(BaseModel):
+    total_risks: int
+    total_analyses: int
+    severity_distribution: Dict[str, int]
+    type_distribution: Dict[str, int]
+    by_contract_type: Dict[str, Dict[str, int]]
+    confidence_percentiles: Dict[str, float]
+    confidence_histogram: List[Dict[str, Any]]
+    overall_risk_score_percentiles: Dict[str, float]
+    compliance_score_percentiles: Dict[str, float]
+    trend: List[Dict[str, Any]]
+
 class DashboardStats(BaseModel):
     contracts_analyzed: int
     high_risk_detected: int
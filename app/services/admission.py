@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+from ..config import settings
+from .fair_scheduler import FairScheduler
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_BATCH = "batch"
+
+class _Stage:
+    """Concurrency-limited stage with queue depth and an EWMA of service time"""
+
+    def __init__(self, name: str, concurrency: int, initial_seconds: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.queued = 0
+        self.service_seconds = initial_seconds
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Semaphores are bound to the event loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self):
+        semaphore = self._get_semaphore()
+        self.queued += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        started = time.perf_counter()
+        cancelled = False
+        try:
+            yield
+        except asyncio.CancelledError:
+            cancelled = True  # e.g. a losing hedge; its truncated time says nothing about service time
+            raise
+        finally:
+            self.in_flight -= 1
+            semaphore.release()
+            if not cancelled:
+                elapsed = time.perf_counter() - started
+                self.service_seconds += settings.ADMISSION_EWMA_ALPHA * (elapsed - self.service_seconds)
+
+    def wait_seconds(self) -> float:
+        """Expected queueing delay for one more unit of work"""
+        backlog = self.in_flight + self.queued - self.concurrency + 1
+        if backlog <= 0:
+            return 0.0
+        return backlog / self.concurrency * self.service_seconds
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "service_seconds": round(self.service_seconds, 2),
+            "wait_seconds": round(self.wait_seconds(), 2),
+        }
+
+class AdmissionController:
+    """Reject uploads early when they would not finish within the proxy timeout
+
+    Extraction and LLM calls each run through a concurrency-limited stage that
+    tracks queue depth and service time. Batch uploads are shed first, as soon as
+    the queueing delay passes a small threshold. Interactive uploads are shed only
+    once queueing plus their own service time would approach the proxy timeout.
+    Retry-After is the time for the queues to drain back below the class threshold.
+
+    With Celery enabled the web tier does no extraction or LLM work, so the same
+    policy is applied to the worker queues instead: depth comes from the fair
+    scheduler in Redis and service time from the workers' shared EWMA.
+    """
+
+    def __init__(self):
+        self.extraction = _Stage("extraction", settings.ADMISSION_EXTRACTION_CONCURRENCY, 2.0)
+        self.llm = _Stage("llm", settings.ADMISSION_LLM_CONCURRENCY, settings.ADMISSION_INITIAL_LLM_SECONDS)
+        self.uploads_in_flight = 0
+        self.rejected = {PRIORITY_INTERACTIVE: 0, PRIORITY_BATCH: 0}
+        self.queues: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._scheduler: Optional[FairScheduler] = None
+
+    def classify(self, requested: Optional[str], file_count: int) -> str:
+        if requested == PRIORITY_BATCH or file_count >= settings.ADMISSION_BATCH_FILE_THRESHOLD:
+            return PRIORITY_BATCH
+        return PRIORITY_INTERACTIVE
+
+    def queue_wait(self) -> float:
+        return self.extraction.wait_seconds() + self.llm.wait_seconds()
+
+    def estimated_latency(self, file_count: int) -> float:
+        """Queueing delay plus service time for an upload of file_count files"""
+        per_file = self.extraction.service_seconds + self.llm.service_seconds
+        return self.queue_wait() + file_count * per_file
+
+    def check(self, priority: str, file_count: int) -> Optional[int]:
+        """Return None to admit, or the Retry-After seconds for a 429
+        
+        Only queueing delay is held against capacity. An interactive upload's own
+        service time shrinks the delay it can tolerate, never below zero, so an
+        upload is always admitted by an idle server and Retry-After is always
+        time for the queues to drain.
+        """
+        if priority == PRIORITY_BATCH:
+            budget = settings.ADMISSION_BATCH_MAX_WAIT_SECONDS
+        else:
+            own_seconds = self.estimated_latency(file_count) - self.queue_wait()
+            budget = max(0.0, settings.ADMISSION_INTERACTIVE_MAX_SECONDS - own_seconds)
+        wait = self.queue_wait()
+        over_capacity = self.uploads_in_flight >= settings.ADMISSION_MAX_UPLOADS
+        if wait <= budget and not over_capacity:
+            return None
+
+        with self._lock:
+            self.rejected[priority] += 1
+        retry_after = wait - budget if wait > budget else self.llm.service_seconds
+        return max(1, math.ceil(retry_after))
+
+    def check_queued(self, priority: str, file_count: int, queue: str, user_id: int) -> Optional[int]:
+        """Like check(), but against a Celery queue's fair-share backlog; blocks on Redis
+        
+        The scheduler hands out jobs round-robin per user, so the jobs ahead of the
+        caller's next one are its own backlog plus, from every other user, at most
+        one job per round the caller has to wait. A user with a deep backlog delays
+        everyone by one job per round rather than by their whole queue.
+        """
+        if self._scheduler is None:
+            self._scheduler = FairScheduler()
+        try:
+            pending, running = self._scheduler.backlog(queue)
+            service_seconds = self._scheduler.service_seconds(queue)
+        except Exception as e:
+            # Admission is an optimisation; enqueueing reports a Redis outage on its own
+            logger.warning(f"Could not read backlog of {queue}, admitting upload: {str(e)}")
+            return None
+        if service_seconds is None:
+            service_seconds = self.extraction.service_seconds + self.llm.service_seconds
+
+        own = pending.pop(str(user_id), 0)
+        rounds = own + 1
+        ahead = own + sum(min(count, rounds) for count in pending.values())
+        workers = max(1, settings.ADMISSION_QUEUE_WORKERS)
+        backlog = max(0, running + ahead - workers + 1)
+        wait = backlog / workers * service_seconds
+        self.queues[queue] = {
+            "active_users": len(pending) + (1 if own else 0),
+            "waiting": own + sum(pending.values()),
+            "running": running,
+            "workers": workers,
+            "service_seconds": round(service_seconds, 2),
+        }
+
+        if priority == PRIORITY_BATCH:
+            budget = settings.ADMISSION_QUEUE_BATCH_MAX_WAIT_SECONDS
+        else:
+            budget = settings.ADMISSION_QUEUE_INTERACTIVE_MAX_WAIT_SECONDS
+        if wait <= budget:
+            return None
+
+        with self._lock:
+            self.rejected[priority] += 1
+        return max(1, math.ceil(wait - budget))
+
+    @asynccontextmanager
+    async def upload(self):
+        self.uploads_in_flight += 1
+        try:
+            yield
+        finally:
+            self.uploads_in_flight -= 1
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "uploads_in_flight": self.uploads_in_flight,
+            "max_uploads": settings.ADMISSION_MAX_UPLOADS,
+            "queue_wait_seconds": round(self.queue_wait(), 2),
+            "estimated_latency_seconds": round(self.estimated_latency(1), 2),
+            "thresholds_seconds": {
+                PRIORITY_INTERACTIVE: settings.ADMISSION_INTERACTIVE_MAX_SECONDS,
+                PRIORITY_BATCH: settings.ADMISSION_BATCH_MAX_WAIT_SECONDS,
+            },
+            "queue_thresholds_seconds": {
+                PRIORITY_INTERACTIVE: settings.ADMISSION_QUEUE_INTERACTIVE_MAX_WAIT_SECONDS,
+                PRIORITY_BATCH: settings.ADMISSION_QUEUE_BATCH_MAX_WAIT_SECONDS,
+            },
+            "queues": dict(self.queues),
+            "rejected": dict(self.rejected),
+            "extraction": self.extraction.status(),
+            "llm": self.llm.status(),
+        }
+
+admission = AdmissionController()
@@ -1,24 +1,63 @@
-import openai
+import asyncio
 import json
+import hashlib
 import logging
-from typing import Dict, List, Any
+import time
+from typing import Dict, List, Any, Optional
 from datetime import datetime
 import uuid
 
+from openai import AsyncOpenAI, APITimeoutError
+
 from ..config import settings
 from ..models.schemas import AnalysisResult, RiskItem, Insight, ContractType, AnalysisDepth, RiskLevel
 from ..utils.exceptions import AIAnalysisException
+from .ai_metrics import ai_metrics
+from .model_router import ModelRouter
+from .single_flight import SingleFlight
+from .prompt_templates import get_template, PROMPT_VERSION, TRIAGE_LEVELS
+from .profiler import profiler
+from .hedging import latency_policy
+from .admission import admission
 
 logger = logging.getLogger(__name__)
 
+def _censored(primary: asyncio.Future) -> bool:
+    """True if the primary request gave up or was abandoned without a response"""
+    if not primary.done() or primary.cancelled():
+        return True
+    return isinstance(primary.exception(), (asyncio.TimeoutError, APITimeoutError))
+
 class AIAnalyzer:
     """Service for AI-powered contract analysis using OpenAI GPT"""
     
     def __init__(self):
         if not settings.OPENAI_API_KEY:
             logger.warning("OpenAI API key not configured. AI analysis will not work.")
-        else:
-            openai.api_key = settings.OPENAI_API_KEY
+        self.router = ModelRouter()
+        self.single_flight = SingleFlight(prefix="analysis")
+        self._client = None
+        self._client_loop = None
+    
+    def _get_client(self) -> AsyncOpenAI:
+        # The client's connection pool is bound to the event loop it was created on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                base_url=settings.OPENAI_API_BASE or None,
+                max_retries=0  # timeouts and backup requests are handled by _hedged_request
+            )
+            self._client_loop = loop
+        return self._client
+    
+    async def aclose(self) -> None:
+        """Release connections held for the current event loop"""
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            await self._client.close()
+            self._client = None
+            self._client_loop = None
+        await self.single_flight.aclose()
     
     async def analyze_contract(
         self, 
@@ -35,14 +74,15 @@ class AIAnalyzer:
                     status_code=503
                 )
             
-            # Create analysis prompt based on contract type and depth
-            prompt = self._create_analysis_prompt(text, contract_type, analysis_depth)
-            
-            # Call OpenAI API
-            response = await self._call_openai(prompt)
-            
-            # Parse and structure the response
-            analysis_data = self._parse_ai_response(response)
+            # Identical documents uploaded concurrently share a single AI call
+            if settings.COALESCE_ENABLED:
+                key = self._coalesce_key(text, contract_type, analysis_depth)
+                analysis_data = await self.single_flight.run(
+                    key,
+                    lambda: self._run_analysis(text, contract_type, analysis_depth, filename)
+                )
+            else:
+                analysis_data = await self._run_analysis(text, contract_type, analysis_depth, filename)
             
             # Create structured analysis result
             analysis_result = AnalysisResult(
@@ -65,128 +105,197 @@ class AIAnalyzer:
                 status_code=500
             )
     
-    def _create_analysis_prompt(self, text: str, contract_type: str, analysis_depth: str) -> str:
-        """Create analysis prompt based on contract type and depth"""
-        
-        base_prompt = f"""
-        You are an expert legal contract analyzer. Analyze the following {contract_type} contract with {analysis_depth} analysis depth.
+    async def _run_analysis(
+        self,
+        text: str,
+        contract_type: str,
+        analysis_depth: str,
+        filename: str
+    ) -> Dict[str, Any]:
+        """Run the prompt through the routed model(s) and return JSON-ready analysis fields"""
+        template = get_template(contract_type, analysis_depth)
         
-        Contract Text:
-        {text[:8000]}  # Truncate to avoid token limits
+        # Pick a model tier, escalating to the large model if the fast tier is not trusted
+        route = self.router.plan(contract_type, analysis_depth, text)
+        if route.allow_escalation and settings.TRIAGE_ENABLED:
+            route = self.router.after_triage(route, await self._triage(template, text, route.model))
+        messages = template.render(text, route.model)
+        with profiler.stage(f"llm:{route.route}"):
+            response = await self._call_openai(messages, model=route.model, route=route.route)
         
-        Please provide a comprehensive analysis in the following JSON format:
-        {{
-            "summary": "Brief summary of the contract",
-            "key_terms": [
-                {{"term": "term name", "value": "term value", "importance": "high/medium/low"}}
-            ],
-            "risks": [
-                {{
-                    "type": "risk category",
-                    "severity": "low/medium/high/critical",
-                    "description": "detailed description",
-                    "recommendation": "how to address this risk",
-                    "confidence": 0.85,
-                    "location": "section/clause reference"
-                }}
-            ],
-            "insights": [
-                {{
-                    "category": "insight category",
-                    "title": "insight title",
-                    "description": "detailed description",
-                    "impact": "potential impact",
-                    "recommendation": "recommended action"
-                }}
-            ],
-            "compliance_score": 0.75,
-            "overall_risk_score": 0.65,
-            "negotiation_points": ["point 1", "point 2"],
-            "missing_clauses": ["clause 1", "clause 2"],
-            "improvements": ["improvement 1", "improvement 2"]
-        }}
-        """
+        # Parse and structure the response
+        analysis_data = self._parse_ai_response(response)
         
-        # Add specific analysis based on contract type
-        if contract_type == "employment":
-            base_prompt += """
-            
-            Focus on:
-            - Compensation and benefits
-            - Termination clauses
-            - Non-compete and confidentiality
-            - Intellectual property rights
-            - Work conditions and expectations
-            """
-        elif contract_type == "nda":
-            base_prompt += """
-            
-            Focus on:
-            - Definition of confidential information
-            - Permitted disclosures
-            - Term and survival
-            - Return of information
-            - Remedies for breach
-            """
-        elif contract_type == "service":
-            base_prompt += """
-            
-            Focus on:
-            - Scope of services
-            - Payment terms
-            - Performance standards
-            - Liability and indemnification
-            - Termination conditions
-            """
+        if route.allow_escalation:
+            reason = self.router.escalation_reason(analysis_data)
+            if reason:
+                logger.info(f"Escalating {filename} to {settings.OPENAI_MODEL}: {reason}")
+                ai_metrics.record_escalation(route.route)
+                route = self.router.escalate(route)
+                messages = template.render(text, route.model)
+                with profiler.stage(f"llm:{route.route}"):
+                    response = await self._call_openai(messages, model=route.model, route=route.route)
+                analysis_data = self._parse_ai_response(response)
         
-        # Add depth-specific instructions
-        if analysis_depth == "deep":
-            base_prompt += """
-            
-            Provide detailed clause-by-clause analysis with legal precedents where applicable.
-            """
-        elif analysis_depth == "compliance":
-            base_prompt += """
-            
-            Focus heavily on regulatory compliance, industry standards, and legal requirements.
-            """
-        elif analysis_depth == "risk_assessment":
-            base_prompt += """
-            
-            Prioritize risk identification and mitigation strategies.
-            """
-        
-        return base_prompt
+        # Plain JSON so the result can be shared with coalesced callers in other workers
+        analysis_data["risks"] = [risk.model_dump(mode="json") for risk in analysis_data["risks"]]
+        analysis_data["insights"] = [insight.model_dump(mode="json") for insight in analysis_data["insights"]]
+        analysis_data["prompt_version"] = template.version
+        return analysis_data
     
-    async def _call_openai(self, prompt: str) -> str:
-        """Call OpenAI API with the analysis prompt"""
+    async def _triage(self, template, text: str, model: str) -> Optional[str]:
+        """Risk level from a quick fast-model screen of the contract, or None if it fails"""
         try:
-            response = await openai.ChatCompletion.acreate(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert legal contract analyzer. Always respond with valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=4000,
-                temperature=0.1,
-                timeout=60
+            with profiler.stage("llm:triage"):
+                response = await self._call_openai(
+                    template.render_triage(text),
+                    model=model,
+                    route="triage",
+                    timeout=settings.TRIAGE_TIMEOUT_SECONDS
+                )
+            start = response.find('{')
+            end = response.rfind('}') + 1
+            level = json.loads(response[start:end]).get("risk_level")
+        except (AIAnalysisException, ValueError, AttributeError) as e:
+            logger.warning(f"Triage failed, routing without it: {str(e)}")
+            return None
+        return level if level in TRIAGE_LEVELS else None
+    
+    def _coalesce_key(self, text: str, contract_type: str, analysis_depth: str) -> str:
+        """Key identifying identical analysis requests"""
+        content_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{content_hash}:{contract_type}:{analysis_depth}:v{PROMPT_VERSION}"
+    
+    async def _call_openai(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = None,
+        route: str = "default",
+        timeout: Optional[float] = None
+    ) -> str:
+        """Call OpenAI API with the analysis messages
+        
+        A fixed timeout sends a single request, bypassing hedging and the adaptive
+        timeout, so short calls such as triage stay out of the model's latency window.
+        """
+        model = model or settings.OPENAI_MODEL
+        started = time.perf_counter()
+        try:
+            if timeout is None:
+                response, latency = await self._hedged_request(messages, model, route)
+            else:
+                response = await self._request(messages, model, timeout)
+                latency = time.perf_counter() - started
+            
+            usage = getattr(response, "usage", None)
+            prompt_details = getattr(usage, "prompt_tokens_details", None)
+            if isinstance(prompt_details, dict):
+                # Not modelled by older SDK versions, which keep it as a plain dict
+                cached_prompt_tokens = prompt_details.get("cached_tokens", 0)
+            else:
+                cached_prompt_tokens = getattr(prompt_details, "cached_tokens", 0)
+            ai_metrics.record_call(
+                route,
+                model,
+                latency,
+                prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                completion_tokens=getattr(usage, "completion_tokens", 0) or 0,
+                cached_prompt_tokens=cached_prompt_tokens or 0
             )
             
             return response.choices[0].message.content
             
         except Exception as e:
-            logger.error(f"OpenAI API error: {str(e)}")
+            ai_metrics.record_call(route, model, time.perf_counter() - started, error=True)
+            error = str(e) or type(e).__name__  # timeouts carry no message
+            logger.error(f"OpenAI API error: {error}")
             raise AIAnalysisException(
-                f"AI service unavailable: {str(e)}",
+                f"AI service unavailable: {error}",
                 status_code=503
             )
     
+    async def _hedged_request(self, messages: List[Dict[str, str]], model: str, route: str):
+        """Send the request, firing one backup if it outlives the model's rolling p90
+        
+        The first successful response wins and the other request is cancelled. Each
+        request holds its own admission.llm slot, and timing starts once the primary
+        holds one, so local queueing neither triggers hedges nor counts as latency.
+        Returns the response and its latency.
+        
+        Only the primary's latency is fed to the latency policy. Recording the
+        winner would drag p90/p99 down every time a hedge fires, making hedges and
+        timeouts progressively more aggressive. When the primary never answers
+        (cancelled after the hedge won, or timed out) its elapsed time is recorded
+        as a censored sample: the true latency was at least that long, and leaving
+        those calls out would let the window drift down and keep timeouts from ever
+        growing when a model slows past them.
+        """
+        timeout = latency_policy.timeout(model)
+        hedge_after = latency_policy.hedge_delay(model)
+        
+        primary_started = asyncio.Event()
+        primary = asyncio.ensure_future(self._request(messages, model, timeout, primary_started))
+        tasks = [primary]
+        hedged = False
+        started = None
+        try:
+            waiter = asyncio.ensure_future(primary_started.wait())
+            await asyncio.wait([primary, waiter], return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            started = time.monotonic()
+            
+            if hedge_after is not None and hedge_after < timeout:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done and latency_policy.allow_hedge():
+                    hedged = True
+                    remaining = timeout - (time.monotonic() - started)
+                    tasks.append(asyncio.ensure_future(self._request(messages, model, remaining)))
+            
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        latency = time.monotonic() - started
+                        if task is primary:
+                            latency_policy.record_latency(model, latency)
+                        if hedged:
+                            ai_metrics.record_hedge(route, won=task is not primary)
+                        return task.result(), latency
+                    error = task.exception()
+            if hedged:
+                ai_metrics.record_hedge(route, won=False)
+            raise error
+        finally:
+            latency_policy.record_call(hedged)
+            if started is not None and _censored(primary):
+                latency_policy.record_latency(model, time.monotonic() - started)
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    async def _request(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        timeout: float,
+        started: Optional[asyncio.Event] = None
+    ):
+        async with admission.llm.slot():
+            if started is not None:
+                started.set()
+            return await asyncio.wait_for(
+                self._get_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    max_tokens=4000,
+                    temperature=0.1,
+                    timeout=timeout
+                ),
+                timeout=timeout
+            )
+    
     def _parse_ai_response(self, response: str) -> Dict[str, Any]:
         """Parse and validate AI response"""
         try:
@@ -0,0 +1,109 @@
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Any, Optional
+
+# USD per 1K tokens as (prompt, completion)
+MODEL_PRICING = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-3.5-turbo": (0.0015, 0.002),
+    "gpt-3.5-turbo-16k": (0.003, 0.004),
+}
+
+# Providers bill cached prompt tokens at a discount
+CACHED_PROMPT_DISCOUNT = 0.5
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_prompt_tokens: int = 0) -> float:
+    """Estimate the USD cost of a completion, 0.0 for unknown models"""
+    prompt_price, completion_price = MODEL_PRICING.get(model, (0.0, 0.0))
+    billed_prompt = prompt_tokens - cached_prompt_tokens * CACHED_PROMPT_DISCOUNT
+    return (billed_prompt * prompt_price + completion_tokens * completion_price) / 1000
+
+def _percentile(values, pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+class _RouteStats:
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.escalations = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latencies = deque(maxlen=window)
+
+class AIMetrics:
+    """In-process counters for LLM calls, grouped by route"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._routes = defaultdict(lambda: _RouteStats(self.window))
+        self._lock = threading.Lock()
+
+    def record_call(
+        self,
+        route: str,
+        model: str,
+        latency: float,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_prompt_tokens: int = 0,
+        error: bool = False
+    ) -> None:
+        with self._lock:
+            stats = self._routes[route]
+            stats.calls += 1
+            stats.latencies.append(latency)
+            if error:
+                stats.errors += 1
+                return
+            stats.prompt_tokens += prompt_tokens
+            stats.cached_prompt_tokens += cached_prompt_tokens
+            stats.completion_tokens += completion_tokens
+            stats.cost += estimate_cost(model, prompt_tokens, completion_tokens, cached_prompt_tokens)
+
+    def record_escalation(self, route: str) -> None:
+        with self._lock:
+            self._routes[route].escalations += 1
+
+    def record_hedge(self, route: str, won: bool) -> None:
+        with self._lock:
+            stats = self._routes[route]
+            stats.hedges += 1
+            if won:
+                stats.hedge_wins += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summarise every route for reporting"""
+        with self._lock:
+            return {
+                route: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "escalations": stats.escalations,
+                    "escalation_rate": stats.escalations / stats.calls if stats.calls else 0.0,
+                    "hedges": stats.hedges,
+                    "hedge_rate": stats.hedges / stats.calls if stats.calls else 0.0,
+                    "hedge_wins": stats.hedge_wins,
+                    "prompt_tokens": stats.prompt_tokens,
+                    "cached_prompt_tokens": stats.cached_prompt_tokens,
+                    "prompt_cache_hit_rate": (
+                        stats.cached_prompt_tokens / stats.prompt_tokens if stats.prompt_tokens else 0.0
+                    ),
+                    "completion_tokens": stats.completion_tokens,
+                    "cost_usd": round(stats.cost, 4),
+                    "latency_p50": _percentile(stats.latencies, 50),
+                    "latency_p95": _percentile(stats.latencies, 95),
+                    "latency_p99": _percentile(stats.latencies, 99),
+                }
+                for route, stats in self._routes.items()
+            }
+
+ai_metrics = AIMetrics()
@@ -0,0 +1,168 @@
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from ..database import ContractAnalysis, RiskRecord, RiskVector, InsightRecord
+from ..models.schemas import AnalysisResult, RiskItem, Insight
+from .risk_analytics import SEVERITY_RANK, risk_analytics
+
+logger = logging.getLogger(__name__)
+
+class AnalysisStore:
+    """Service for persisting analysis results on ContractAnalysis rows"""
+
+    def create_pending(
+        self,
+        db: Session,
+        analysis_id: str,
+        user_id: int,
+        filename: str,
+        contract_type: str,
+        analysis_depth: str,
+        file_size: int,
+        status: str = "processing",
+        queue: Optional[str] = None,
+        stored_path: Optional[str] = None
+    ) -> ContractAnalysis:
+        """Create an analysis row before the work has been done"""
+        row = ContractAnalysis(
+            id=analysis_id,
+            user_id=user_id,
+            filename=filename,
+            contract_type=contract_type,
+            analysis_depth=analysis_depth,
+            file_size=file_size,
+            status=status,
+            queue=queue,
+            stored_path=stored_path
+        )
+        db.add(row)
+        db.commit()
+        # No refresh: that would open a transaction and hold a pooled connection
+        # for as long as the caller spends on extraction and the AI call
+        return row
+
+    def save_result(self, db: Session, row: ContractAnalysis, result: AnalysisResult) -> ContractAnalysis:
+        """Write a completed analysis back to its row"""
+        row.summary = result.summary
+        row.risks_json = json.dumps([risk.model_dump(mode="json") for risk in result.risks])
+        row.insights_json = json.dumps([insight.model_dump(mode="json") for insight in result.insights])
+        row.key_terms_json = json.dumps(result.key_terms)
+        row.negotiation_points_json = json.dumps(result.negotiation_points)
+        row.missing_clauses_json = json.dumps(result.missing_clauses)
+        row.improvements_json = json.dumps(result.improvements)
+        row.compliance_score = result.compliance_score
+        row.overall_risk_score = result.overall_risk_score
+        row.prompt_version = result.prompt_version
+        row.status = "completed"
+        row.error_message = None
+        row.completed_at = datetime.utcnow()
+        self._replace_normalized_rows(db, row, result)
+        db.commit()
+        risk_analytics.invalidate(row.user_id)
+        return row
+    
+    def _replace_normalized_rows(self, db: Session, row: ContractAnalysis, result: AnalysisResult) -> None:
+        """Mirror risks and insights into the indexed analytics tables"""
+        db.query(RiskRecord).filter(RiskRecord.analysis_id == row.id).delete(synchronize_session=False)
+        db.query(RiskVector).filter(RiskVector.analysis_id == row.id).delete(synchronize_session=False)
+        db.query(InsightRecord).filter(InsightRecord.analysis_id == row.id).delete(synchronize_session=False)
+        
+        created_at = row.completed_at
+        db.add(risk_analytics.build_vector(
+            db,
+            analysis_id=row.id,
+            user_id=row.user_id,
+            contract_type=row.contract_type,
+            created_at=created_at,
+            compliance_score=result.compliance_score,
+            overall_risk_score=result.overall_risk_score,
+            risks=[
+                (risk.type.strip().lower(), SEVERITY_RANK[risk.severity.value], risk.confidence)
+                for risk in result.risks
+            ]
+        ))
+        db.add_all([
+            RiskRecord(
+                analysis_id=row.id,
+                user_id=row.user_id,
+                contract_type=row.contract_type,
+                analysis_depth=row.analysis_depth,
+                type=risk.type,
+                type_key=risk.type.strip().lower(),
+                severity=risk.severity.value,
+                severity_rank=SEVERITY_RANK[risk.severity.value],
+                confidence=risk.confidence,
+                description=risk.description,
+                recommendation=risk.recommendation,
+                location=risk.location,
+                compliance_score=result.compliance_score,
+                overall_risk_score=result.overall_risk_score,
+                created_at=created_at
+            )
+            for risk in result.risks
+        ])
+        db.add_all([
+            InsightRecord(
+                analysis_id=row.id,
+                user_id=row.user_id,
+                contract_type=row.contract_type,
+                category=insight.category,
+                category_key=insight.category.strip().lower(),
+                title=insight.title,
+                description=insight.description,
+                impact=insight.impact,
+                recommendation=insight.recommendation,
+                created_at=created_at
+            )
+            for insight in result.insights
+        ])
+
+    def mark_failed(self, db: Session, row: ContractAnalysis, error_message: str) -> ContractAnalysis:
+        """Record a failed analysis, discarding anything left uncommitted by the failure"""
+        db.rollback()
+        row.status = "failed"
+        row.error_message = error_message
+        row.completed_at = datetime.utcnow()
+        db.commit()
+        return row
+
+    def get(self, db: Session, analysis_id: str, user_id: int) -> Optional[ContractAnalysis]:
+        """Fetch an analysis row owned by the given user"""
+        return (
+            db.query(ContractAnalysis)
+            .filter(ContractAnalysis.id == analysis_id, ContractAnalysis.user_id == user_id)
+            .first()
+        )
+
+    def to_result(self, row: ContractAnalysis) -> AnalysisResult:
+        """Rebuild an AnalysisResult from a completed row"""
+        return AnalysisResult(
+            id=row.id,
+            filename=row.filename,
+            contract_type=row.contract_type,
+            analysis_depth=row.analysis_depth,
+            created_at=row.created_at,
+            summary=row.summary or "",
+            key_terms=self._loads(row.key_terms_json),
+            risks=[RiskItem(**risk) for risk in self._loads(row.risks_json)],
+            insights=[Insight(**insight) for insight in self._loads(row.insights_json)],
+            compliance_score=row.compliance_score or 0.0,
+            overall_risk_score=row.overall_risk_score or 0.0,
+            negotiation_points=self._loads(row.negotiation_points_json),
+            missing_clauses=self._loads(row.missing_clauses_json),
+            improvements=self._loads(row.improvements_json),
+            prompt_version=row.prompt_version
+        )
+
+    def _loads(self, value: Optional[str]) -> list:
+        if not value:
+            return []
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError as e:
+            logger.error(f"Corrupt JSON column on analysis row: {str(e)}")
+            return []
@@ -66,6 +66,13 @@ class AuthService:
             logger.error(f"Token validation error: {str(e)}")
             raise AuthenticationException("Token validation failed", status_code=401)
     
+    async def get_current_admin(self, token: str) -> dict:
+        """Validate JWT token and require an admin user"""
+        user = await self.get_current_user(token)
+        if user["email"] not in settings.ADMIN_EMAILS:
+            raise AuthenticationException("Admin access required", status_code=403)
+        return user
+    
     def hash_password(self, password: str) -> str:
         """Hash password using bcrypt"""
         salt = bcrypt.gensalt()
@@ -1,22 +1,83 @@
+import asyncio
+import bisect
 import io
 import logging
-from typing import Union
-import PyPDF2
+import re
+from typing import Union, List, Optional, Dict, Any
 import docx
 from pathlib import Path
 
+from ..config import settings
+from ..models.schemas import AnalysisResult
 from ..utils.exceptions import DocumentProcessingException
+from .extraction_cache import ExtractionCache
+from .pdf_extraction import PDFExtractor, PDFExtractionUnavailable
 
 logger = logging.getLogger(__name__)
 
+# Bump when a change to extraction or normalization alters the text for the same file
+EXTRACTOR_VERSION = "1"
+
+# Only formats whose parsing costs more than hashing, compressing and writing the
+# result; .doc goes through the same python-docx parser as .docx
+CACHED_EXTENSIONS = {'.pdf', '.docx', '.doc'}
+
+_CLAUSE_NUMBER = re.compile(r"\d+(?:\.\d+)*")
+
+class ExtractedDocument:
+    """Normalized document text with the character offset at which each page starts"""
+
+    def __init__(self, text: str, page_offsets: List[int] = None):
+        self.text = text
+        self.page_offsets = page_offsets or [0]
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_offsets)
+
+    def page_for_offset(self, offset: int) -> int:
+        """1-based page containing the character at offset"""
+        return max(1, bisect.bisect_right(self.page_offsets, offset))
+
+    def find_page(self, location: str) -> Optional[int]:
+        """Best-effort page for a section/clause reference such as Section 9.2"""
+        lowered = self.text.lower()
+        offset = lowered.find(location.strip().lower())
+        if offset < 0:
+            match = _CLAUSE_NUMBER.search(location)
+            if not match:
+                return None
+            heading = re.search(
+                rf"(?im)^\s*(?:section|clause|article)?\s*{re.escape(match.group())}(?![\d.]\d)",
+                self.text
+            )
+            if not heading:
+                return None
+            offset = heading.start()
+        return self.page_for_offset(offset)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"text": self.text, "page_offsets": self.page_offsets}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ExtractedDocument":
+        return cls(data["text"], data.get("page_offsets"))
+
 class DocumentProcessor:
     """Service for processing and extracting text from various document formats"""
     
     def __init__(self):
         self.supported_extensions = {'.pdf', '.docx', '.doc', '.txt'}
+        self.pdf_extractor = PDFExtractor()
+        self.cache = ExtractionCache() if settings.EXTRACTION_CACHE_ENABLED else None
     
     async def extract_text(self, content: bytes, filename: str) -> str:
         """Extract text from document content based on file extension"""
+        document = await self.extract_document(content, filename)
+        return document.text
+    
+    async def extract_document(self, content: bytes, filename: str) -> ExtractedDocument:
+        """Extract text and page offsets, served from the extraction cache when possible"""
         try:
             file_extension = Path(filename).suffix.lower()
             
@@ -26,17 +87,24 @@ class DocumentProcessor:
                     status_code=400
                 )
             
+            if self.cache is None or file_extension not in CACHED_EXTENSIONS:
+                document, complete = await self._extract(content, file_extension)
+                return document
+            
+            # PDF text depends on which backend extracted it
+            version = EXTRACTOR_VERSION
             if file_extension == '.pdf':
-                return await self._extract_from_pdf(content)
-            elif file_extension in ['.docx', '.doc']:
-                return await self._extract_from_docx(content)
-            elif file_extension == '.txt':
-                return await self._extract_from_txt(content)
-            else:
-                raise DocumentProcessingException(
-                    f"Handler not implemented for {file_extension}",
-                    status_code=500
-                )
+                version += ":" + ",".join(self.pdf_extractor.backend_order)
+            # Hashing a large upload takes long enough to stall the event loop
+            key, cached = await asyncio.to_thread(self._cache_lookup, content, file_extension, version)
+            if cached is not None:
+                return ExtractedDocument.from_dict(cached)
+            
+            document, complete = await self._extract(content, file_extension)
+            # Partial extractions (timed-out pages) are retried next time rather than cached
+            if complete:
+                await asyncio.to_thread(self.cache.put, key, document.to_dict())
+            return document
                 
         except DocumentProcessingException:
             raise
@@ -47,15 +115,34 @@ class DocumentProcessor:
                 status_code=500
             )
     
-    async def _extract_from_pdf(self, content: bytes) -> str:
-        """Extract text from PDF content"""
+    def _cache_lookup(self, content: bytes, file_extension: str, version: str):
+        key = self.cache.make_key(content, file_extension, version)
+        return key, self.cache.get(key)
+    
+    async def _extract(self, content: bytes, file_extension: str):
+        """Return the extracted document and whether every page was extracted"""
+        if file_extension == '.pdf':
+            return await self._extract_from_pdf(content)
+        elif file_extension in ['.docx', '.doc']:
+            return ExtractedDocument(await self._extract_from_docx(content)), True
+        elif file_extension == '.txt':
+            return ExtractedDocument(await self._extract_from_txt(content)), True
+        else:
+            raise DocumentProcessingException(
+                f"Handler not implemented for {file_extension}",
+                status_code=500
+            )
+    
+    async def _extract_from_pdf(self, content: bytes):
+        """Extract text from PDF content, recording where each page starts"""
         try:
-            pdf_file = io.BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            result = await self.pdf_extractor.extract(content)
             
             text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+            page_offsets = []
+            for page_text in result.pages:
+                page_offsets.append(len(text))
+                text += page_text + "\n"
             
             if not text.strip():
                 raise DocumentProcessingException(
@@ -63,8 +150,20 @@ class DocumentProcessor:
                     status_code=400
                 )
             
-            return text.strip()
+            # Keep offsets aligned with the stripped text
+            leading = len(text) - len(text.lstrip())
+            page_offsets = [max(0, offset - leading) for offset in page_offsets]
+            document = ExtractedDocument(text.strip(), page_offsets)
+            return document, not result.failed_pages
             
+        except DocumentProcessingException:
+            raise
+        except PDFExtractionUnavailable as e:
+            logger.error(f"PDF extraction workers failed: {str(e)}")
+            raise DocumentProcessingException(
+                "PDF extraction is temporarily unavailable, please retry",
+                status_code=503
+            )
         except Exception as e:
             logger.error(f"PDF extraction error: {str(e)}")
             raise DocumentProcessingException(
@@ -131,6 +230,20 @@ class DocumentProcessor:
                 status_code=500
             )
     
+    def annotate_locations(self, analysis: AnalysisResult, document: ExtractedDocument) -> AnalysisResult:
+        """Append the page number to risk locations of multi-page documents"""
+        if document.page_count < 2:
+            return analysis
+        
+        risks = []
+        for risk in analysis.risks:
+            if risk.location and "page" not in risk.location.lower():
+                page = document.find_page(risk.location)
+                if page is not None:
+                    risk = risk.model_copy(update={"location": f"{risk.location} (page {page})"})
+            risks.append(risk)
+        return analysis.model_copy(update={"risks": risks})
+    
     def validate_file(self, filename: str, content_length: int, max_size: int = 50 * 1024 * 1024) -> bool:
         """Validate file before processing"""
         file_extension = Path(filename).suffix.lower()
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Other processes write to the same directory, so the local size estimate is
+# re-read from disk at least this often
+_SIZE_REFRESH_SECONDS = 30.0
+
+class ExtractionCache:
+    """Compressed on-disk cache of extracted documents, bounded by total size
+
+    Entries are gzip-compressed JSON files named after the SHA-256 of the raw upload
+    plus the extractor version, so changing extraction logic never serves stale text.
+    Reads refresh the file's mtime, and eviction removes the least recently used
+    entries once the directory grows past EXTRACTION_CACHE_MAX_MB. The directory can
+    be shared by web and worker processes; writes are atomic renames, and each
+    process periodically re-reads the directory size so that entries written by
+    the others count towards the budget.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = Path(directory or settings.EXTRACTION_CACHE_DIR)
+        self.max_bytes = max_bytes or settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._estimated_bytes = self._scan_size()
+        self._scanned_at = time.monotonic()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(content: bytes, extension: str, extractor_version: str) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        version = hashlib.sha256(f"{extension}:{extractor_version}".encode("utf-8")).hexdigest()[:12]
+        return f"{digest}-{version}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self.directory / f"{key}.json.gz"
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                data = json.load(f)
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            data = None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable extraction cache entry {key}: {str(e)}")
+            self._remove(path)
+            data = None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def put(self, key: str, data: Dict[str, Any]) -> None:
+        payload = gzip.compress(json.dumps(data).encode("utf-8"), compresslevel=6)
+        if len(payload) > self.max_bytes:
+            return
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.directory / f"{key}.json.gz")
+        except OSError as e:
+            logger.warning(f"Could not write extraction cache entry {key}: {str(e)}")
+            self._remove(Path(tmp_path))
+            return
+
+        with self._lock:
+            if time.monotonic() - self._scanned_at >= _SIZE_REFRESH_SECONDS:
+                self._estimated_bytes = self._scan_size()
+                self._scanned_at = time.monotonic()
+            else:
+                self._estimated_bytes += len(payload)
+            over_budget = self._estimated_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is at 90% of its budget"""
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.json.gz"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            entries.sort()
+
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * 0.9
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+                self.evictions += 1
+            self._estimated_bytes = total
+            self._scanned_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "bytes": self._estimated_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _scan_size(self) -> int:
+        total = 0
+        for path in self.directory.glob("*.json.gz"):
+            try:
+                total += path.stat().st_size
+            except FileNotFoundError:
+                continue  # evicted by another process mid-scan
+        return total
+
+    def _remove(self, path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove extraction cache file {path}: {str(e)}")
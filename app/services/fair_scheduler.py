@@ -0,0 +1,171 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import redis
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+# Each queue keeps one job list per user plus a ring of users with pending work.
+# The scripts run atomically inside Redis so a user is never dropped from the ring
+# while a job for them is being pushed, and a job is never out of both its user's
+# list and the running set.
+_ENQUEUE_SCRIPT = """
+local jobs_key = KEYS[1] .. ':jobs:' .. ARGV[1]
+redis.call('RPUSH', jobs_key, ARGV[2])
+if redis.call('SADD', KEYS[1] .. ':active', ARGV[1]) == 1 then
+    redis.call('RPUSH', KEYS[1] .. ':ring', ARGV[1])
+end
+return redis.call('LLEN', jobs_key)
+"""
+
+# Claimed jobs move to a running ZSET scored by lease deadline, with their owner
+# recorded so an expired claim can be put back on the right user's list.
+_DEQUEUE_SCRIPT = """
+local ring_key = KEYS[1] .. ':ring'
+local active_key = KEYS[1] .. ':active'
+local now = redis.call('TIME')
+local deadline = tonumber(now[1]) + tonumber(ARGV[1])
+local users = redis.call('LLEN', ring_key)
+for i = 1, users do
+    local user = redis.call('LPOP', ring_key)
+    if not user then
+        return false
+    end
+    local jobs_key = KEYS[1] .. ':jobs:' .. user
+    local job = redis.call('LPOP', jobs_key)
+    if redis.call('LLEN', jobs_key) > 0 then
+        redis.call('RPUSH', ring_key, user)
+    else
+        redis.call('SREM', active_key, user)
+    end
+    if job then
+        redis.call('ZADD', KEYS[1] .. ':running', deadline, job)
+        redis.call('HSET', KEYS[1] .. ':owners', job, user)
+        return job
+    end
+end
+return false
+"""
+
+_HEARTBEAT_SCRIPT = """
+local running_key = KEYS[1] .. ':running'
+if not redis.call('ZSCORE', running_key, ARGV[1]) then
+    return 0
+end
+local now = redis.call('TIME')
+redis.call('ZADD', running_key, tonumber(now[1]) + tonumber(ARGV[2]), ARGV[1])
+return 1
+"""
+
+_ACK_SCRIPT = """
+redis.call('ZREM', KEYS[1] .. ':running', ARGV[1])
+redis.call('HDEL', KEYS[1] .. ':owners', ARGV[1])
+redis.call('HDEL', KEYS[1] .. ':attempts', ARGV[1])
+return 1
+"""
+
+_SERVICE_TIME_SCRIPT = """
+local key = KEYS[1] .. ':service_seconds'
+local seconds = tonumber(ARGV[1])
+local current = tonumber(redis.call('GET', key))
+if current then
+    seconds = current + tonumber(ARGV[2]) * (seconds - current)
+end
+redis.call('SET', key, tostring(seconds))
+return tostring(seconds)
+"""
+
+# Expired claims go back to the front of their user's list, or are given up on
+# once they have been claimed max_attempts times without finishing.
+_REAP_SCRIPT = """
+local running_key = KEYS[1] .. ':running'
+local owners_key = KEYS[1] .. ':owners'
+local attempts_key = KEYS[1] .. ':attempts'
+local now = redis.call('TIME')
+local expired = redis.call('ZRANGEBYSCORE', running_key, '-inf', now[1])
+local requeued = {}
+local dead = {}
+for _, job in ipairs(expired) do
+    redis.call('ZREM', running_key, job)
+    local user = redis.call('HGET', owners_key, job)
+    redis.call('HDEL', owners_key, job)
+    local attempts = redis.call('HINCRBY', attempts_key, job, 1)
+    if not user or attempts >= tonumber(ARGV[1]) then
+        redis.call('HDEL', attempts_key, job)
+        table.insert(dead, job)
+    else
+        redis.call('LPUSH', KEYS[1] .. ':jobs:' .. user, job)
+        if redis.call('SADD', KEYS[1] .. ':active', user) == 1 then
+            redis.call('RPUSH', KEYS[1] .. ':ring', user)
+        end
+        table.insert(requeued, job)
+    end
+end
+return {requeued, dead}
+"""
+
+class FairScheduler:
+    """Round-robin job selection across users for a Celery queue
+
+    Celery messages only carry the queue name; the job a worker runs is picked
+    here at execution time, one user at a time, so a single large batch cannot
+    starve other users sharing the queue. A picked job is only leased: the worker
+    heartbeats while it runs and acks when done, and reap() returns jobs whose
+    worker died to their user's list.
+    """
+
+    def __init__(self, redis_url: str = None, prefix: str = "fair"):
+        self.client = redis.Redis.from_url(redis_url or settings.REDIS_URL, decode_responses=True)
+        self.prefix = prefix
+        self._enqueue = self.client.register_script(_ENQUEUE_SCRIPT)
+        self._dequeue = self.client.register_script(_DEQUEUE_SCRIPT)
+        self._heartbeat = self.client.register_script(_HEARTBEAT_SCRIPT)
+        self._ack = self.client.register_script(_ACK_SCRIPT)
+        self._reap = self.client.register_script(_REAP_SCRIPT)
+        self._service_time = self.client.register_script(_SERVICE_TIME_SCRIPT)
+
+    def _key(self, queue: str) -> str:
+        return f"{self.prefix}:{queue}"
+
+    def enqueue(self, queue: str, user_id: int, analysis_id: str) -> int:
+        """Add a job to the user's list, returning that user's backlog length"""
+        return int(self._enqueue(keys=[self._key(queue)], args=[user_id, analysis_id]))
+
+    def next_job(self, queue: str) -> Optional[str]:
+        """Claim the next job for the queue, rotating through users"""
+        return self._dequeue(keys=[self._key(queue)], args=[settings.CELERY_JOB_LEASE_SECONDS]) or None
+
+    def heartbeat(self, queue: str, analysis_id: str) -> bool:
+        """Extend a claimed job's lease; False if it has already been reaped"""
+        return bool(self._heartbeat(keys=[self._key(queue)], args=[analysis_id, settings.CELERY_JOB_LEASE_SECONDS]))
+
+    def ack(self, queue: str, analysis_id: str) -> None:
+        """Release a claimed job once it has completed or failed"""
+        self._ack(keys=[self._key(queue)], args=[analysis_id])
+
+    def reap(self, queue: str) -> Tuple[List[str], List[str]]:
+        """Requeue jobs with expired leases; returns (requeued, abandoned) job IDs"""
+        requeued, dead = self._reap(keys=[self._key(queue)], args=[settings.CELERY_JOB_MAX_ATTEMPTS])
+        return list(requeued), list(dead)
+
+    def backlog(self, queue: str) -> Tuple[Dict[str, int], int]:
+        """Waiting jobs per active user, and the number of claimed (running) jobs"""
+        key = self._key(queue)
+        users = sorted(self.client.smembers(f"{key}:active"))
+        pipe = self.client.pipeline(transaction=False)
+        for user in users:
+            pipe.llen(f"{key}:jobs:{user}")
+        pipe.zcard(f"{key}:running")
+        *pending, running = pipe.execute()
+        return {user: int(count) for user, count in zip(users, pending) if int(count)}, int(running)
+
+    def record_service_time(self, queue: str, seconds: float, alpha: float) -> None:
+        """Fold one job's duration into the queue's shared EWMA"""
+        self._service_time(keys=[self._key(queue)], args=[seconds, alpha])
+
+    def service_seconds(self, queue: str) -> Optional[float]:
+        value = self.client.get(f"{self._key(queue)}:service_seconds")
+        return float(value) if value is not None else None
+
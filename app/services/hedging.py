@@ -0,0 +1,58 @@
+import threading
+from collections import defaultdict, deque
+from typing import Optional
+
+from ..config import settings
+
+class LatencyPolicy:
+    """Adaptive timeouts and hedge delays from observed per-model latency
+
+    Until a model has LLM_ADAPTIVE_MIN_SAMPLES successful calls the fixed
+    LLM_TIMEOUT_SECONDS applies and no hedging happens.
+    """
+
+    def __init__(self, window: int = 500):
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._hedged = deque(maxlen=window)  # one bool per call, True if a hedge fired
+        self._lock = threading.Lock()
+
+    def record_latency(self, model: str, latency: float) -> None:
+        with self._lock:
+            self._latencies[model].append(latency)
+
+    def percentile(self, model: str, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = list(self._latencies[model])
+        if len(samples) < settings.LLM_ADAPTIVE_MIN_SAMPLES:
+            return None
+        samples.sort()
+        return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+
+    def timeout(self, model: str) -> float:
+        """Overall budget for one call: a multiple of p99, clamped"""
+        p99 = self.percentile(model, 99)
+        if p99 is None:
+            return settings.LLM_TIMEOUT_SECONDS
+        return min(
+            settings.LLM_TIMEOUT_MAX_SECONDS,
+            max(settings.LLM_TIMEOUT_MIN_SECONDS, p99 * settings.LLM_TIMEOUT_P99_MULTIPLIER)
+        )
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before firing a backup request, or None to never hedge"""
+        if not settings.LLM_HEDGING_ENABLED:
+            return None
+        return self.percentile(model, settings.LLM_HEDGE_PERCENTILE)
+
+    def record_call(self, hedged: bool) -> None:
+        with self._lock:
+            self._hedged.append(hedged)
+
+    def allow_hedge(self) -> bool:
+        """Keep hedges under LLM_HEDGE_MAX_RATE of recent calls to bound extra spend"""
+        with self._lock:
+            calls = len(self._hedged)
+            hedges = sum(self._hedged)
+        return hedges + 1 <= settings.LLM_HEDGE_MAX_RATE * (calls + 1)
+
+latency_policy = LatencyPolicy()
@@ -0,0 +1,96 @@
+import logging
+from typing import Dict, Any, Optional
+
+from pydantic import BaseModel
+
+from ..config import settings
+from ..models.schemas import RiskLevel
+
+logger = logging.getLogger(__name__)
+
+ESCALATION_SEVERITIES = {RiskLevel.HIGH, RiskLevel.CRITICAL}
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English prose)"""
+    return len(text) // 4 + 1
+
+class ModelRoute(BaseModel):
+    model: str
+    tier: str  # fast, large
+    route: str  # metrics label
+    allow_escalation: bool
+    document_tokens: int
+
+class ModelRouter:
+    """Pick a model tier per request and decide when to escalate"""
+
+    def plan(self, contract_type: str, analysis_depth: str, text: str) -> ModelRoute:
+        """Route on the full extracted text, not the truncated prompt, so document
+        length still distinguishes a one-page NDA from a 100-page MSA"""
+        document_tokens = estimate_tokens(text)
+
+        if not settings.MODEL_ROUTING_ENABLED or analysis_depth in settings.ALWAYS_LARGE_DEPTHS:
+            return self._large(analysis_depth, document_tokens)
+
+        if contract_type in settings.ALWAYS_LARGE_CONTRACT_TYPES:
+            logger.info(f"Routing {contract_type}/{analysis_depth} to large model: contract type")
+            return self._large(analysis_depth, document_tokens)
+
+        if document_tokens > settings.FAST_MODEL_MAX_DOCUMENT_TOKENS:
+            logger.info(f"Routing {contract_type}/{analysis_depth} to large model: {document_tokens} document tokens")
+            return self._large(analysis_depth, document_tokens)
+
+        return ModelRoute(
+            model=settings.OPENAI_FAST_MODEL,
+            tier="fast",
+            route=f"fast:{analysis_depth}",
+            allow_escalation=True,
+            document_tokens=document_tokens
+        )
+
+    def escalate(self, route: ModelRoute) -> ModelRoute:
+        """Route used when the fast tier's answer is not trusted"""
+        return ModelRoute(
+            model=settings.OPENAI_MODEL,
+            tier="large",
+            route=f"escalated:{route.route.split(':', 1)[1]}",
+            allow_escalation=False,
+            document_tokens=route.document_tokens
+        )
+
+    def after_triage(self, route: ModelRoute, risk_level: Optional[str]) -> ModelRoute:
+        """Skip the fast tier when triage flags the contract as high risk; its full
+        analysis would only be escalated and rerun on the large model"""
+        if risk_level != "high":
+            return route
+        return ModelRoute(
+            model=settings.OPENAI_MODEL,
+            tier="large",
+            route=f"triaged:{route.route.split(':', 1)[1]}",
+            allow_escalation=False,
+            document_tokens=route.document_tokens
+        )
+
+    def escalation_reason(self, analysis_data: Dict[str, Any]) -> Optional[str]:
+        """Return why a fast-tier analysis needs the large model, or None"""
+        risks = analysis_data.get("risks", [])
+
+        severe = [risk for risk in risks if risk.severity in ESCALATION_SEVERITIES]
+        if severe:
+            return f"{len(severe)} high/critical risks"
+
+        if risks:
+            confidence = sum(risk.confidence for risk in risks) / len(risks)
+            if confidence < settings.ESCALATION_MIN_CONFIDENCE:
+                return f"low confidence ({confidence:.2f})"
+
+        return None
+
+    def _large(self, analysis_depth: str, document_tokens: int) -> ModelRoute:
+        return ModelRoute(
+            model=settings.OPENAI_MODEL,
+            tier="large",
+            route=f"large:{analysis_depth}",
+            allow_escalation=False,
+            document_tokens=document_tokens
+        )
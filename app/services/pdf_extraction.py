@@ -0,0 +1,391 @@
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional, Tuple, Any
+
+import PyPDF2
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+class PageTimeout(Exception):
+    """Raised inside a worker when a single page exceeds its time budget"""
+
+class PDFExtractionUnavailable(Exception):
+    """No page could be extracted because workers hung or crashed; worth retrying"""
+
+class PDFBackend:
+    """Text extraction backend; subclasses must be importable in worker processes"""
+
+    name = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def open(self, path: str):
+        raise NotImplementedError
+
+    def page_count(self, document) -> int:
+        raise NotImplementedError
+
+    def extract_page(self, document, index: int) -> str:
+        raise NotImplementedError
+
+    def close(self, document) -> None:
+        pass
+
+class PyPDF2Backend(PDFBackend):
+    name = "pypdf2"
+
+    def open(self, path: str):
+        with open(path, "rb") as f:
+            return PyPDF2.PdfReader(io.BytesIO(f.read()))
+
+    def page_count(self, document) -> int:
+        return len(document.pages)
+
+    def extract_page(self, document, index: int) -> str:
+        return document.pages[index].extract_text() or ""
+
+class PyMuPDFBackend(PDFBackend):
+    name = "pymupdf"
+
+    @classmethod
+    def available(cls) -> bool:
+        return fitz is not None
+
+    def open(self, path: str):
+        return fitz.open(path)
+
+    def page_count(self, document) -> int:
+        return document.page_count
+
+    def extract_page(self, document, index: int) -> str:
+        return document.load_page(index).get_text()
+
+    def close(self, document) -> None:
+        document.close()
+
+class PdfiumBackend(PDFBackend):
+    name = "pdfium"
+
+    @classmethod
+    def available(cls) -> bool:
+        return pypdfium2 is not None
+
+    def open(self, path: str):
+        return pypdfium2.PdfDocument(path)
+
+    def page_count(self, document) -> int:
+        return len(document)
+
+    def extract_page(self, document, index: int) -> str:
+        page = document[index]
+        try:
+            text_page = page.get_textpage()
+            try:
+                return text_page.get_text_range()
+            finally:
+                text_page.close()
+        finally:
+            page.close()
+
+    def close(self, document) -> None:
+        document.close()
+
+BACKENDS = {backend.name: backend for backend in (PyPDF2Backend, PyMuPDFBackend, PdfiumBackend)}
+
+def available_backends() -> List[str]:
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+# Worker process side
+
+def _init_worker(memory_limit_mb: int) -> None:
+    if resource is not None and memory_limit_mb:
+        limit = memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _raise_timeout(signum, frame):
+    raise PageTimeout()
+
+def _extract_pages(backend_name: str, path: str, indices: List[int], page_timeout: float) -> List[Tuple[int, Optional[str], Optional[str]]]:
+    """Extract the given pages, returning (index, text, error) per page"""
+    backend = BACKENDS[backend_name]()
+    use_alarm = (
+        hasattr(signal, "SIGALRM")
+        and page_timeout > 0
+        and threading.current_thread() is threading.main_thread()
+    )
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+
+    document = backend.open(path)
+    results = []
+    try:
+        for index in indices:
+            try:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, page_timeout)
+                try:
+                    results.append((index, backend.extract_page(document, index), None))
+                finally:
+                    if use_alarm:
+                        signal.setitimer(signal.ITIMER_REAL, 0)
+            except PageTimeout:
+                results.append((index, None, f"timed out after {page_timeout}s"))
+            except MemoryError:
+                results.append((index, None, "exceeded memory limit"))
+            except Exception as e:
+                results.append((index, None, str(e) or type(e).__name__))
+    finally:
+        backend.close(document)
+    return results
+
+def _page_count(backend_name: str, path: str) -> int:
+    backend = BACKENDS[backend_name]()
+    document = backend.open(path)
+    try:
+        return backend.page_count(document)
+    finally:
+        backend.close(document)
+
+class PDFExtractionResult:
+    def __init__(self, pages: List[str], failed_pages: Dict[int, str], backends_used: Dict[str, int]):
+        self.pages = pages
+        self.failed_pages = failed_pages
+        self.backends_used = backends_used
+
+class PDFExtractor:
+    """Page-parallel PDF text extraction with per-page limits and backend fallback
+
+    Pages are split into contiguous chunks and extracted in worker processes. Each page
+    gets a wall-clock budget (SIGALRM) and each worker an address-space limit, so a
+    pathological content stream costs one page rather than the whole upload. Every
+    chunk runs on a single-process lane it has to itself, so a worker that hangs or
+    dies is killed without touching other documents. Pages a backend fails on are
+    retried with the next available backend; pages no backend can read are reported
+    as failed and left empty.
+    """
+
+    def __init__(self):
+        self.workers = settings.PDF_WORKERS or os.cpu_count() or 1
+        self.parallel_min_pages = settings.PDF_PARALLEL_MIN_PAGES
+        self.page_timeout = settings.PDF_PAGE_TIMEOUT_SECONDS
+        self.memory_limit_mb = settings.PDF_WORKER_MEMORY_MB
+        self.backend_order = self._backend_order()
+        self._idle_lanes: List[Executor] = []
+        self._thread_lanes = False
+        self._lanes_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._semaphore_loop = None
+        self._stats = defaultdict(lambda: {"documents": 0, "pages": 0, "failed_pages": 0, "bytes": 0, "seconds": 0.0})
+        self._stats_lock = threading.Lock()
+
+    def _backend_order(self) -> List[str]:
+        installed = available_backends()
+        preferred = [name for name in settings.PDF_BACKENDS if name in installed]
+        if not preferred:
+            logger.warning(f"No configured PDF backend installed ({settings.PDF_BACKENDS}), using pypdf2")
+            preferred = ["pypdf2"]
+        # Anything else installed is a fallback
+        return preferred + [name for name in installed if name not in preferred]
+
+    async def extract(self, content: bytes) -> PDFExtractionResult:
+        fd, path = tempfile.mkstemp(suffix=".pdf")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            return await self._extract_path(path, len(content))
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def _extract_path(self, path: str, size: int) -> PDFExtractionResult:
+        page_count, opened_with = await self._count_pages(path)
+
+        pages: List[Optional[str]] = [None] * page_count
+        errors: Dict[int, str] = {}
+        backends_used: Dict[str, int] = {}
+        backend_failure = None
+
+        for backend_name in self.backend_order[self.backend_order.index(opened_with):]:
+            pending = [index for index, text in enumerate(pages) if text is None]
+            if not pending:
+                break
+
+            started = time.perf_counter()
+            try:
+                results = await self._run_backend(backend_name, path, pending)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                logger.warning(f"PDF backend {backend_name} failed on document: {error}")
+                for index in pending:
+                    errors[index] = f"{backend_name}: {error}"
+                backend_failure = error
+                continue
+
+            extracted = 0
+            for index, text, error in results:
+                if error is None:
+                    pages[index] = text
+                    errors.pop(index, None)
+                    extracted += 1
+                else:
+                    errors[index] = f"{backend_name}: {error}"
+            backends_used[backend_name] = extracted
+            self._record(backend_name, extracted, len(pending) - extracted, size, time.perf_counter() - started)
+
+        if backend_failure and all(text is None for text in pages):
+            # Nothing was read because workers hung or crashed, not because the PDF has no text
+            raise PDFExtractionUnavailable(backend_failure)
+
+        if errors:
+            logger.warning(
+                f"PDF extraction returned partial text: {len(errors)}/{page_count} pages failed "
+                f"(first: page {min(errors) + 1}, {errors[min(errors)]})"
+            )
+
+        return PDFExtractionResult([text or "" for text in pages], errors, backends_used)
+
+    async def _count_pages(self, path: str) -> Tuple[int, str]:
+        last_error = None
+        for backend_name in self.backend_order:
+            try:
+                return await self._submit(self.page_timeout + 30, _page_count, backend_name, path), backend_name
+            except asyncio.TimeoutError:
+                last_error = "timed out opening document"
+            except BrokenProcessPool:
+                last_error = "worker crashed while opening document"
+            except Exception as e:
+                last_error = str(e)
+        raise ValueError(f"No PDF backend could open the document: {last_error}")
+
+    async def _run_backend(self, backend_name: str, path: str, indices: List[int]):
+        chunks = self._chunk(indices)
+        # Backstop for pages stuck in C code that SIGALRM cannot interrupt
+        deadline = self.page_timeout * max(len(chunk) for chunk in chunks) + 30
+        chunk_results = await asyncio.gather(*(
+            self._submit(deadline, _extract_pages, backend_name, path, chunk, self.page_timeout)
+            for chunk in chunks
+        ))
+        return [result for chunk in chunk_results for result in chunk]
+
+    def _chunk(self, indices: List[int]) -> List[List[int]]:
+        if len(indices) < self.parallel_min_pages or self.workers == 1:
+            return [indices]
+        size = -(-len(indices) // self.workers)
+        return [indices[i:i + size] for i in range(0, len(indices), size)]
+
+    async def _submit(self, timeout: float, fn, *args):
+        """Run fn on a lane of its own, killing that lane if it hangs, crashes or is abandoned"""
+        async with self._get_semaphore():
+            lane = self._acquire_lane()
+            try:
+                result = await asyncio.wait_for(
+                    asyncio.get_running_loop().run_in_executor(lane, fn, *args),
+                    timeout=timeout
+                )
+            except (asyncio.TimeoutError, asyncio.CancelledError, BrokenProcessPool):
+                self._discard_lane(lane)
+                raise
+            except BaseException:
+                # Raised by fn itself; the worker is still healthy
+                self._release_lane(lane)
+                raise
+            self._release_lane(lane)
+            return result
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # Bounds busy lanes to self.workers
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            if multiprocessing.current_process().daemon and not self._thread_lanes:
+                logger.warning(
+                    "Daemonic process (Celery prefork?) cannot start extraction workers; "
+                    "PDFs are extracted serially in a thread, without page time or memory "
+                    "limits, and a hung page is never killed. Run workers with --pool=threads."
+                )
+                self._thread_lanes = True
+                self.workers = 1
+            self._semaphore = asyncio.Semaphore(self.workers)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    def _acquire_lane(self) -> Executor:
+        with self._lanes_lock:
+            if self._idle_lanes:
+                return self._idle_lanes.pop()
+        if self._thread_lanes:
+            return ThreadPoolExecutor(max_workers=1)
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.memory_limit_mb,)
+        )
+
+    def _release_lane(self, lane: Executor) -> None:
+        with self._lanes_lock:
+            self._idle_lanes.append(lane)
+
+    def _discard_lane(self, lane: Executor) -> None:
+        """Kill a lane's hung or dead worker; only the document using it is affected"""
+        for process in list((getattr(lane, "_processes", None) or {}).values()):
+            process.kill()
+        lane.shutdown(wait=False, cancel_futures=True)
+
+    def close(self) -> None:
+        """Shut down idle worker processes"""
+        with self._lanes_lock:
+            lanes, self._idle_lanes = self._idle_lanes, []
+        for lane in lanes:
+            lane.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, backend_name: str, pages: int, failed: int, size: int, seconds: float) -> None:
+        with self._stats_lock:
+            stats = self._stats[backend_name]
+            stats["documents"] += 1
+            stats["pages"] += pages
+            stats["failed_pages"] += failed
+            stats["bytes"] += size
+            stats["seconds"] += seconds
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-backend throughput since startup"""
+        with self._stats_lock:
+            return {
+                name: dict(
+                    stats,
+                    pages_per_second=round(stats["pages"] / stats["seconds"], 2) if stats["seconds"] else 0.0,
+                    mb_per_second=round(stats["bytes"] / 1024 / 1024 / stats["seconds"], 2) if stats["seconds"] else 0.0
+                )
+                for name, stats in self._stats.items()
+            }
@@ -0,0 +1,304 @@
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Any
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_current_capture: contextvars.ContextVar[Optional["RequestCapture"]] = contextvars.ContextVar(
+    "profiler_capture", default=None
+)
+
+class RequestCapture:
+    """Samples and stage timings collected while one request runs"""
+
+    def __init__(self, method: str, path: str, content_length: int):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.content_length = content_length
+        self.started = time.perf_counter()
+        self.started_at = datetime.utcnow()
+        self.samples: Counter = Counter()
+        self.stages: List[Dict[str, Any]] = []
+        self.files: List[Dict[str, Any]] = []
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+class ProfileFilter:
+    """Which requests an admin-opened profiling window applies to"""
+
+    def __init__(self, until: float, extensions: Optional[List[str]] = None, min_size_mb: float = 0.0):
+        self.until = until
+        self.extensions = [ext.lower() for ext in extensions or []]
+        self.min_size_mb = min_size_mb
+
+    def active(self) -> bool:
+        return time.monotonic() < self.until
+
+    def matches(self, capture: RequestCapture) -> bool:
+        files = capture.files or [{"filename": "", "size": capture.content_length}]
+        for item in files:
+            if self.extensions and Path(item["filename"]).suffix.lower() not in self.extensions:
+                continue
+            if item["size"] < self.min_size_mb * 1024 * 1024:
+                continue
+            return True
+        return False
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "seconds_remaining": max(0.0, round(self.until - time.monotonic(), 1)),
+            "extensions": self.extensions,
+            "min_size_mb": self.min_size_mb,
+        }
+
+class SamplingProfiler:
+    """On-demand wall-clock sampling of upload requests
+
+    Nothing runs unless slow-request capture is armed or an admin opens a profiling
+    window: the middleware only checks `enabled` and the sampler thread exists only
+    while at least one request is being watched. Samples are process-wide stacks
+    taken while a watched request is in flight, written as collapsed stacks
+    (`frame;frame;frame count`) that flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self):
+        self.output_dir = Path(settings.PROFILER_DIR)
+        self.interval = settings.PROFILER_INTERVAL_MS / 1000
+        self.slow_threshold_ms = settings.PROFILER_SLOW_REQUEST_MS
+        self.slow_capture = settings.PROFILER_SLOW_CAPTURE_ENABLED
+        self.max_captures = settings.PROFILER_MAX_CAPTURES
+        self.window: Optional[ProfileFilter] = None
+        self._active: Dict[str, RequestCapture] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        if self.window is not None and not self.window.active():
+            self.window = None
+        return self.slow_capture or self.window is not None
+
+    def configure(
+        self,
+        slow_capture: Optional[bool] = None,
+        slow_threshold_ms: Optional[int] = None,
+        window_seconds: Optional[int] = None,
+        extensions: Optional[List[str]] = None,
+        min_size_mb: float = 0.0
+    ) -> None:
+        if slow_capture is not None:
+            self.slow_capture = slow_capture
+        if slow_threshold_ms is not None:
+            self.slow_threshold_ms = slow_threshold_ms
+        if window_seconds:
+            self.window = ProfileFilter(time.monotonic() + window_seconds, extensions, min_size_mb)
+
+    def disable(self) -> None:
+        self.slow_capture = False
+        self.window = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "slow_capture": self.slow_capture,
+            "slow_threshold_ms": self.slow_threshold_ms,
+            "window": self.window.describe() if self.window else None,
+            "interval_ms": self.interval * 1000,
+            "in_flight": len(self._active),
+        }
+
+    # Request lifecycle
+
+    def begin(self, method: str, path: str, content_length: int) -> RequestCapture:
+        capture = RequestCapture(method, path, content_length)
+        with self._lock:
+            self._active[capture.id] = capture
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+                self._thread.start()
+        _current_capture.set(capture)
+        return capture
+
+    def end(self, capture: RequestCapture, status_code: int) -> Optional[str]:
+        """Stop watching a request and persist it if it was slow or matched the window"""
+        with self._lock:
+            self._active.pop(capture.id, None)
+            # The sampler updates captures under the lock, so this copy is final
+            samples = Counter(capture.samples)
+
+        elapsed_ms = capture.elapsed_ms()
+        reason = None
+        if self.slow_capture and elapsed_ms >= self.slow_threshold_ms:
+            reason = "slow"
+        elif self.window is not None and self.window.active() and self.window.matches(capture):
+            reason = "window"
+        if reason is None:
+            return None
+
+        try:
+            return self._write(capture, samples, status_code, elapsed_ms, reason)
+        except OSError as e:
+            logger.error(f"Could not write profile capture: {str(e)}")
+            return None
+
+    # Instrumentation hooks (no-ops outside a watched request)
+
+    @contextmanager
+    def stage(self, name: str):
+        capture = _current_capture.get()
+        if capture is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            capture.stages.append({
+                "stage": name,
+                "start_ms": round((started - capture.started) * 1000, 2),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            })
+
+    def annotate_file(self, filename: str, size: int) -> None:
+        capture = _current_capture.get()
+        if capture is not None:
+            capture.files.append({"filename": filename, "size": size})
+
+    # Captures on disk
+
+    def list_captures(self) -> List[Dict[str, Any]]:
+        if not self.output_dir.exists():
+            return []
+        return [
+            {"name": path.name, "size": path.stat().st_size}
+            for path in sorted(self.output_dir.iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+        ]
+
+    def capture_path(self, name: str) -> Optional[Path]:
+        path = (self.output_dir / name).resolve()
+        if path.parent != self.output_dir.resolve() or not path.is_file():
+            return None
+        return path
+
+    def _write(self, capture: RequestCapture, samples: Counter, status_code: int, elapsed_ms: float, reason: str) -> str:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{capture.started_at.strftime('%Y%m%dT%H%M%S')}-{capture.id}"
+
+        with open(self.output_dir / f"{stem}.collapsed", "w") as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+        with open(self.output_dir / f"{stem}.json", "w") as f:
+            json.dump({
+                "id": capture.id,
+                "reason": reason,
+                "method": capture.method,
+                "path": capture.path,
+                "status_code": status_code,
+                "started_at": capture.started_at.isoformat(),
+                "elapsed_ms": round(elapsed_ms, 2),
+                "content_length": capture.content_length,
+                "files": capture.files,
+                "samples": sum(samples.values()),
+                "stages": capture.stages,
+            }, f, indent=2)
+
+        self._evict()
+        logger.info(f"Profile captured for {capture.path} ({reason}, {elapsed_ms:.0f}ms): {stem}")
+        return stem
+
+    def _evict(self) -> None:
+        """Keep only the newest max_captures captures (each is a .collapsed/.json pair)"""
+        files = sorted(self.output_dir.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in files[self.max_captures:]:
+            for path in (stale, stale.with_suffix(".collapsed")):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+    # Sampler
+
+    def _sample_loop(self) -> None:
+        own_ident = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active:
+                    self._thread = None
+                    return
+
+            stacks = self._collect_stacks(own_ident)
+            with self._lock:
+                # Only captures still active, so end() never sees a Counter change under it
+                for capture in self._active.values():
+                    capture.samples.update(stacks)
+
+            time.sleep(self.interval)
+
+    def _collect_stacks(self, own_ident: int) -> List[str]:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            frames.append(names.get(ident, str(ident)))
+            stacks.append(";".join(reversed(frames)))
+        return stacks
+
+profiler = SamplingProfiler()
+
+class ProfilerMiddleware:
+    """ASGI middleware that watches upload requests while the profiler is armed
+
+    Written against raw ASGI rather than BaseHTTPMiddleware so that disarmed
+    requests, and every path other than /api/upload, pass straight through without
+    wrapping the body stream. Captures are written to disk off the event loop.
+    """
+
+    def __init__(self, app, path: str = "/api/upload"):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] != self.path or not profiler.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        try:
+            content_length = int(headers.get(b"content-length") or 0)
+        except ValueError:
+            content_length = 0
+        capture = profiler.begin(scope["method"], scope["path"], content_length)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await asyncio.to_thread(profiler.end, capture, status_code)
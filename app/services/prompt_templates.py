@@ -0,0 +1,167 @@
+from typing import Dict, List, Tuple
+
+from ..config import settings
+from ..models.schemas import ContractType, AnalysisDepth
+
+# Bump whenever any static prompt text below changes
+PROMPT_VERSION = "4"
+
+# Truncate contract text to avoid token limits
+MAX_CONTRACT_CHARS = 8000
+
+# OpenAI only caches prompt prefixes of at least this many tokens
+MIN_CACHEABLE_PREFIX_TOKENS = 1024
+
+# Shared by every request so providers can cache it as a common prefix
+SYSTEM_PROMPT = """You are an expert legal contract analyzer. Always respond with valid JSON.
+
+Provide a comprehensive analysis in the following JSON format:
+{
+    "summary": "Brief summary of the contract",
+    "key_terms": [
+        {"term": "term name", "value": "term value", "importance": "high/medium/low"}
+    ],
+    "risks": [
+        {
+            "type": "risk category",
+            "severity": "low/medium/high/critical",
+            "description": "detailed description",
+            "recommendation": "how to address this risk",
+            "confidence": 0.85,
+            "location": "section/clause reference"
+        }
+    ],
+    "insights": [
+        {
+            "category": "insight category",
+            "title": "insight title",
+            "description": "detailed description",
+            "impact": "potential impact",
+            "recommendation": "recommended action"
+        }
+    ],
+    "compliance_score": 0.75,
+    "overall_risk_score": 0.65,
+    "negotiation_points": ["point 1", "point 2"],
+    "missing_clauses": ["clause 1", "clause 2"],
+    "improvements": ["improvement 1", "improvement 2"]
+}"""
+
+PADDING_LINE = "(Padding so this prompt prefix can be cached. It contains no instructions; ignore it.)"
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+def _cacheable_system_prompt() -> str:
+    """SYSTEM_PROMPT padded with inert lines past the minimum cacheable prefix
+
+    The 25% margin covers the rough token estimate, so the padded prompt clears
+    the minimum under any tokenizer.
+    """
+    target = MIN_CACHEABLE_PREFIX_TOKENS * 5 // 4
+    lines = []
+    while _estimate_tokens(SYSTEM_PROMPT + "\n\n" + "\n".join(lines)) < target:
+        lines.append(PADDING_LINE)
+    return SYSTEM_PROMPT + "\n\n" + "\n".join(lines)
+
+# Only worth sending to models with automatic prompt caching; elsewhere the padding
+# is billed in full on every call
+CACHEABLE_SYSTEM_PROMPT = _cacheable_system_prompt()
+
+# Cheap screening call on the fast model, used only to pick a model tier
+TRIAGE_PROMPT = """You screen legal contracts before a full review. Always respond with valid JSON in the following format:
+{"risk_level": "low/medium/high", "reason": "one short sentence"}
+
+Use "high" when the text contains terms likely to be a high or critical risk for the client, such as uncapped liability, broad indemnities, one-sided termination rights or assignment of intellectual property."""
+
+TRIAGE_LEVELS = {"low", "medium", "high"}
+
+FOCUS_AREAS = {
+    "employment": [
+        "Compensation and benefits",
+        "Termination clauses",
+        "Non-compete and confidentiality",
+        "Intellectual property rights",
+        "Work conditions and expectations",
+    ],
+    "nda": [
+        "Definition of confidential information",
+        "Permitted disclosures",
+        "Term and survival",
+        "Return of information",
+        "Remedies for breach",
+    ],
+    "service": [
+        "Scope of services",
+        "Payment terms",
+        "Performance standards",
+        "Liability and indemnification",
+        "Termination conditions",
+    ],
+}
+
+DEPTH_INSTRUCTIONS = {
+    "deep": "Provide detailed clause-by-clause analysis with legal precedents where applicable.",
+    "compliance": "Focus heavily on regulatory compliance, industry standards, and legal requirements.",
+    "risk_assessment": "Prioritize risk identification and mitigation strategies.",
+}
+
+class PromptTemplate:
+    """Static prompt prefix for one (contract_type, analysis_depth) pair"""
+
+    def __init__(self, contract_type: str, analysis_depth: str):
+        self.contract_type = contract_type
+        self.analysis_depth = analysis_depth
+        self.version = PROMPT_VERSION
+        self.user_prefix = self._build_user_prefix()
+
+    def _build_user_prefix(self) -> str:
+        parts = [
+            f"Analyze the following {self.contract_type} contract with {self.analysis_depth} analysis depth."
+        ]
+
+        focus = FOCUS_AREAS.get(self.contract_type)
+        if focus:
+            parts.append("Focus on:\n" + "\n".join(f"- {area}" for area in focus))
+
+        depth = DEPTH_INSTRUCTIONS.get(self.analysis_depth)
+        if depth:
+            parts.append(depth)
+
+        # Contract text goes last so everything above is a reusable prefix
+        parts.append("Contract Text:\n")
+        return "\n\n".join(parts)
+
+    def render(self, text: str, model: str) -> List[Dict[str, str]]:
+        """Chat messages for the given contract text, padded for caching if the model caches"""
+        system = CACHEABLE_SYSTEM_PROMPT if supports_prompt_caching(model) else SYSTEM_PROMPT
+        return [
+            {"role": "system", "content": system},
+            {"role": "user", "content": self.user_prefix + text[:MAX_CONTRACT_CHARS]},
+        ]
+
+    def render_triage(self, text: str) -> List[Dict[str, str]]:
+        """Chat messages for the triage pass over the start of the contract"""
+        return [
+            {"role": "system", "content": TRIAGE_PROMPT},
+            {"role": "user", "content": f"Contract type: {self.contract_type}\n\nContract Text:\n" + text[:settings.TRIAGE_MAX_CHARS]},
+        ]
+
+def supports_prompt_caching(model: str) -> bool:
+    return any(model.startswith(prefix) for prefix in settings.PROMPT_CACHE_MODELS)
+
+def _compile_templates() -> Dict[Tuple[str, str], PromptTemplate]:
+    return {
+        (contract_type.value, analysis_depth.value): PromptTemplate(contract_type.value, analysis_depth.value)
+        for contract_type in ContractType
+        for analysis_depth in AnalysisDepth
+    }
+
+_TEMPLATES = _compile_templates()
+
+def get_template(contract_type: str, analysis_depth: str) -> PromptTemplate:
+    """Look up the precompiled template, building one for unknown combinations"""
+    template = _TEMPLATES.get((contract_type, analysis_depth))
+    if template is None:
+        template = PromptTemplate(contract_type, analysis_depth)
+    return template
@@ -0,0 +1,381 @@
+import calendar
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Any
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..database import AnalyticsCode, RiskVector
+from ..models.schemas import RiskLevel
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ORDER = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH, RiskLevel.CRITICAL]
+SEVERITY_RANK = {level.value: rank for rank, level in enumerate(SEVERITY_ORDER)}
+
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+TREND_BUCKETS = {"day": 86400, "week": 7 * 86400, "month": 30 * 86400}
+
+KIND_CONTRACT_TYPE = "contract_type"
+KIND_RISK_TYPE = "risk_type"
+
+# One record per risk in RiskVector.risks. The analysis-level fields are repeated
+# per risk so a whole portfolio decodes with a single frombuffer; the byte order
+# is fixed so vectors written on one host read back anywhere.
+RISK_DTYPE = np.dtype([
+    ("severity", "i1"),
+    ("type", "<i4"),
+    ("confidence", "<f8"),  # NaN when missing
+    ("contract_type", "<i4"),
+    ("created_at", "<i8"),
+    ("compliance_score", "<f8"),
+    ("overall_risk_score", "<f8"),
+])
+
+def epoch_seconds(value: datetime) -> int:
+    """Seconds since the epoch; naive datetimes are UTC, as everywhere in the schema"""
+    return calendar.timegm(value.utctimetuple())
+
+class RiskFilter:
+    """Filter for a portfolio risk query, reducible to a cache key"""
+
+    def __init__(
+        self,
+        user_id: int,
+        contract_type: Optional[str] = None,
+        risk_type: Optional[str] = None,
+        min_severity: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        bucket: str = "week"
+    ):
+        self.user_id = user_id
+        self.contract_type = contract_type
+        self.risk_type = risk_type.strip().lower() if risk_type else None
+        self.min_severity = min_severity
+        self.start = start
+        self.end = end
+        self.bucket = bucket if bucket in TREND_BUCKETS else "week"
+
+    def key(self) -> Tuple:
+        return (
+            self.user_id,
+            self.contract_type,
+            self.risk_type,
+            self.min_severity,
+            self.start.isoformat() if self.start else None,
+            self.end.isoformat() if self.end else None,
+            self.bucket,
+        )
+
+class CodeBook:
+    """Integer codes for contract and risk type strings, backed by analytics_codes
+
+    Codes are only cached once they have been read back from the table, so a code
+    inserted by a transaction that later rolls back is never reused.
+    """
+
+    def __init__(self):
+        self._codes: Dict[Tuple[str, str], int] = {}
+        self._values: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, db: Session, kind: str, value: str) -> Optional[int]:
+        """Code for an existing value, or None if nothing was ever stored under it"""
+        with self._lock:
+            code = self._codes.get((kind, value))
+        if code is None:
+            code = self._select(db, kind, [value]).get(value)
+        return code
+
+    def encode(self, db: Session, kind: str, values: Iterable[str]) -> Dict[str, int]:
+        """Codes for the given values, adding missing ones in the caller's transaction"""
+        wanted = set(values)
+        with self._lock:
+            codes = {value: self._codes[(kind, value)] for value in wanted if (kind, value) in self._codes}
+        missing = wanted - codes.keys()
+        if missing:
+            codes.update(self._select(db, kind, missing))
+        new = wanted - codes.keys()
+        if new:
+            db.execute(self._insert_missing(db, [{"kind": kind, "value": value} for value in sorted(new)]))
+            codes.update(self._select(db, kind, new, remember=False))
+        return codes
+
+    def decode(self, db: Session, codes: Iterable[int]) -> Dict[int, str]:
+        codes = set(int(code) for code in codes)
+        with self._lock:
+            missing = codes - self._values.keys()
+        if missing:
+            rows = db.execute(select(AnalyticsCode.id, AnalyticsCode.kind, AnalyticsCode.value).where(AnalyticsCode.id.in_(missing)))
+            with self._lock:
+                for code, kind, value in rows:
+                    self._codes[(kind, value)] = code
+                    self._values[code] = value
+        with self._lock:
+            return {code: self._values.get(code, "unknown") for code in codes}
+
+    def _select(self, db: Session, kind: str, values: Iterable[str], remember: bool = True) -> Dict[str, int]:
+        rows = db.execute(
+            select(AnalyticsCode.value, AnalyticsCode.id).where(AnalyticsCode.kind == kind, AnalyticsCode.value.in_(list(values)))
+        ).all()
+        found = {value: code for value, code in rows}
+        if remember:
+            with self._lock:
+                for value, code in found.items():
+                    self._codes[(kind, value)] = code
+                    self._values[code] = value
+        return found
+
+    @staticmethod
+    def _insert_missing(db: Session, rows: List[Dict[str, str]]):
+        # Concurrent writers may add the same value; let the unique constraint decide
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            return postgresql.insert(AnalyticsCode).values(rows).on_conflict_do_nothing(index_elements=["kind", "value"])
+        if dialect == "sqlite":
+            return sqlite.insert(AnalyticsCode).values(rows).on_conflict_do_nothing(index_elements=["kind", "value"])
+        return AnalyticsCode.__table__.insert().values(rows)
+
+class RiskAnalytics:
+    """Vectorized portfolio analytics over packed per-analysis risk vectors
+
+    Each query reads one RiskVector buffer per analysis, decodes them all with one
+    frombuffer call and computes every aggregate on integer codes. Results are cached per filter for ANALYTICS_CACHE_TTL_SECONDS and
+    dropped early when this process stores a new analysis for the user.
+    """
+
+    def __init__(self):
+        self.ttl = settings.ANALYTICS_CACHE_TTL_SECONDS
+        self.codes = CodeBook()
+        self._cache: Dict[Tuple, Tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            for key in [key for key in self._cache if key[0] == user_id]:
+                del self._cache[key]
+
+    def build_vector(
+        self,
+        db: Session,
+        analysis_id: str,
+        user_id: int,
+        contract_type: str,
+        created_at: datetime,
+        compliance_score: Optional[float],
+        overall_risk_score: Optional[float],
+        risks: List[Tuple[str, int, Optional[float]]]
+    ) -> RiskVector:
+        """Pack (type_key, severity_rank, confidence) triples into a RiskVector row"""
+        codes = self.codes.encode(db, KIND_RISK_TYPE, [type_key for type_key, _, _ in risks])
+        contract_code = self.codes.encode(db, KIND_CONTRACT_TYPE, [contract_type])[contract_type]
+        created_epoch = epoch_seconds(created_at)
+        nan = float("nan")
+        packed = np.array(
+            [
+                (
+                    rank,
+                    codes[type_key],
+                    nan if confidence is None else confidence,
+                    contract_code,
+                    created_epoch,
+                    nan if compliance_score is None else compliance_score,
+                    nan if overall_risk_score is None else overall_risk_score,
+                )
+                for type_key, rank, confidence in risks
+            ],
+            dtype=RISK_DTYPE
+        )
+        return RiskVector(
+            analysis_id=analysis_id,
+            user_id=user_id,
+            contract_type_code=contract_code,
+            created_epoch=created_epoch,
+            risk_count=len(risks),
+            risks=packed.tobytes(),
+        )
+
+    def summarize(self, db: Session, risk_filter: RiskFilter) -> Dict[str, Any]:
+        key = risk_filter.key()
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and now - cached[0] < self.ttl:
+                return cached[1]
+
+        columns = self._load_columns(db, risk_filter)
+        result = self._aggregate(columns, risk_filter.bucket)
+
+        with self._lock:
+            if len(self._cache) >= settings.ANALYTICS_CACHE_MAX_ENTRIES:
+                self._cache = {k: v for k, v in self._cache.items() if now - v[0] < self.ttl}
+            self._cache[key] = (now, result)
+        return result
+
+    def _load_columns(self, db: Session, risk_filter: RiskFilter) -> Dict[str, Any]:
+        stmt = select(RiskVector.risks).where(RiskVector.user_id == risk_filter.user_id, RiskVector.risk_count > 0)
+
+        if risk_filter.contract_type:
+            contract_code = self.codes.lookup(db, KIND_CONTRACT_TYPE, risk_filter.contract_type)
+            if contract_code is None:
+                return {}
+            stmt = stmt.where(RiskVector.contract_type_code == contract_code)
+        type_code = None
+        if risk_filter.risk_type:
+            type_code = self.codes.lookup(db, KIND_RISK_TYPE, risk_filter.risk_type)
+            if type_code is None:
+                return {}
+        if risk_filter.start:
+            stmt = stmt.where(RiskVector.created_epoch >= epoch_seconds(risk_filter.start))
+        if risk_filter.end:
+            stmt = stmt.where(RiskVector.created_epoch < epoch_seconds(risk_filter.end))
+
+        buffers = self._fetch_buffers(db, stmt)
+        if not buffers:
+            return {}
+
+        risks = np.frombuffer(b"".join(buffers), dtype=RISK_DTYPE)
+        counts = np.fromiter(map(len, buffers), dtype=np.int64, count=len(buffers)) // RISK_DTYPE.itemsize
+        starts = np.cumsum(counts) - counts
+        columns = {
+            # Per risk
+            "analysis": np.repeat(np.arange(len(buffers)), counts),
+            "severity": risks["severity"],
+            "type": risks["type"],
+            "confidence": risks["confidence"],
+            # Per analysis, from its first risk
+            "contract_type": risks["contract_type"][starts],
+            "created_at": risks["created_at"][starts],
+            "compliance_score": risks["compliance_score"][starts],
+            "overall_risk_score": risks["overall_risk_score"][starts],
+        }
+
+        mask = None
+        if type_code is not None:
+            mask = columns["type"] == type_code
+        if risk_filter.min_severity in SEVERITY_RANK:
+            severe = columns["severity"] >= SEVERITY_RANK[risk_filter.min_severity]
+            mask = severe if mask is None else mask & severe
+        if mask is not None:
+            if not mask.any():
+                return {}
+            for name in ("analysis", "severity", "type", "confidence"):
+                columns[name] = columns[name][mask]
+
+        used = np.concatenate([
+            np.flatnonzero(np.bincount(columns["type"])),
+            np.unique(columns["contract_type"]),
+        ])
+        columns["names"] = self.codes.decode(db, used.tolist())
+        return columns
+
+    @staticmethod
+    def _fetch_buffers(db: Session, stmt) -> List[bytes]:
+        """Run stmt on the raw DBAPI cursor, skipping Row objects and per-value processing
+        
+        Every bound value is an integer (user id, codes, epoch seconds), so the
+        statement is rendered with literal binds to stay paramstyle-agnostic.
+        """
+        connection = db.connection()
+        sql = str(stmt.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+        cursor = connection.connection.cursor()
+        try:
+            cursor.execute(sql)
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def _aggregate(self, columns: Dict[str, Any], bucket: str) -> Dict[str, Any]:
+        levels = [level.value for level in SEVERITY_ORDER]
+        if not columns:
+            return {
+                "total_risks": 0,
+                "total_analyses": 0,
+                "severity_distribution": {level: 0 for level in levels},
+                "type_distribution": {},
+                "by_contract_type": {},
+                "confidence_percentiles": {},
+                "confidence_histogram": [],
+                "overall_risk_score_percentiles": {},
+                "compliance_score_percentiles": {},
+                "trend": [],
+            }
+
+        names = columns["names"]
+        analysis = columns["analysis"]
+        severity = columns["severity"].astype(np.int64)
+        severity_counts = np.bincount(severity, minlength=len(levels))
+
+        type_counts = np.bincount(columns["type"])
+        types = np.flatnonzero(type_counts)
+        top = types[np.argsort(type_counts[types], kind="stable")[::-1][:settings.ANALYTICS_TOP_TYPES]]
+
+        # Severity distribution per contract type via a 2-D bincount
+        contract_types, contract_index = np.unique(columns["contract_type"][analysis], return_inverse=True)
+        by_contract = np.bincount(
+            contract_index * len(levels) + severity,
+            minlength=len(contract_types) * len(levels)
+        ).reshape(len(contract_types), len(levels))
+
+        confidence = columns["confidence"]
+        confidence_counts, confidence_edges = np.histogram(confidence[~np.isnan(confidence)], bins=10, range=(0.0, 1.0))
+
+        # Trend: severity counts and mean confidence per time bucket, bucketed per
+        # analysis first since all of an analysis's risks share its timestamp
+        bucket_seconds = TREND_BUCKETS[bucket]
+        buckets, analysis_bucket = np.unique(columns["created_at"] // bucket_seconds, return_inverse=True)
+        bucket_index = analysis_bucket[analysis]
+        trend_counts = np.bincount(
+            bucket_index * len(levels) + severity,
+            minlength=len(buckets) * len(levels)
+        ).reshape(len(buckets), len(levels))
+        trend_confidence = np.bincount(bucket_index, weights=np.nan_to_num(confidence), minlength=len(buckets))
+        trend_totals = trend_counts.sum(axis=1)
+        present = trend_totals > 0
+
+        # Scores are per analysis; count each analysis with a matching risk once
+        matched = np.bincount(analysis, minlength=columns["created_at"].size) > 0
+
+        return {
+            "total_risks": int(severity.size),
+            "total_analyses": int(matched.sum()),
+            "severity_distribution": dict(zip(levels, severity_counts.tolist())),
+            "type_distribution": {names[int(code)]: int(type_counts[code]) for code in top},
+            "by_contract_type": {
+                names[int(code)]: dict(zip(levels, counts.tolist()))
+                for code, counts in zip(contract_types, by_contract)
+            },
+            "confidence_percentiles": self._percentiles(confidence),
+            "confidence_histogram": [
+                {"min": round(float(low), 2), "max": round(float(high), 2), "count": int(count)}
+                for low, high, count in zip(confidence_edges[:-1], confidence_edges[1:], confidence_counts)
+            ],
+            "overall_risk_score_percentiles": self._percentiles(columns["overall_risk_score"][matched]),
+            "compliance_score_percentiles": self._percentiles(columns["compliance_score"][matched]),
+            "trend": [
+                {
+                    "bucket_start": datetime.utcfromtimestamp(int(start) * bucket_seconds),
+                    "total": int(total),
+                    "severity": dict(zip(levels, counts.tolist())),
+                    "mean_confidence": round(float(confidence_sum / total), 3) if total else None,
+                }
+                for start, total, counts, confidence_sum in zip(
+                    buckets[present], trend_totals[present], trend_counts[present], trend_confidence[present]
+                )
+            ],
+        }
+
+    def _percentiles(self, values: np.ndarray) -> Dict[str, float]:
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return {}
+        return {f"p{pct}": round(float(value), 4) for pct, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+risk_analytics = RiskAnalytics()
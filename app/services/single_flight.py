@@ -0,0 +1,169 @@
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import redis.asyncio as aioredis
+from redis.exceptions import RedisError
+
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+class SingleFlight:
+    """Coalesce identical in-flight work within a process and across workers
+
+    Callers in the same process share one asyncio future. Across processes a Redis
+    lease elects a leader; followers poll for the leader's published result and
+    take over if the lease expires or is released without a result. The lease is
+    short and renewed by the leader while it works, so a crashed leader is noticed
+    within seconds however long the work takes. Followers give up waiting after
+    wait_seconds and run the work themselves. Results must be JSON-serialisable.
+    If Redis is unreachable, work runs uncoalesced.
+    """
+
+    def __init__(
+        self,
+        redis_url: str = None,
+        prefix: str = "singleflight",
+        lease_seconds: int = None,
+        wait_seconds: int = None,
+        result_ttl: int = None,
+        poll_interval: float = 0.5
+    ):
+        self.redis_url = redis_url or settings.REDIS_URL
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds or settings.COALESCE_LEASE_SECONDS
+        self.wait_seconds = wait_seconds or settings.COALESCE_WAIT_SECONDS
+        self.result_ttl = result_ttl or settings.COALESCE_RESULT_TTL
+        self.poll_interval = poll_interval
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client: Optional[aioredis.Redis] = None
+        self._client_loop = None
+
+    async def run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Return fn()'s result, sharing it with concurrent callers using the same key"""
+        existing = self._inflight.get(key)
+        if existing is not None:
+            try:
+                return await asyncio.shield(existing)
+            except asyncio.CancelledError:
+                if existing.cancelled():
+                    # The local leader was cancelled, not us; try again
+                    return await self.run(key, fn)
+                raise
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._run_distributed(key, fn)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an unawaited failure does not log a warning
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    async def _run_distributed(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        lease_key = f"{self.prefix}:lease:{key}"
+        result_key = f"{self.prefix}:result:{key}"
+        token = str(uuid.uuid4())
+        deadline = time.monotonic() + self.wait_seconds
+
+        while True:
+            try:
+                client = self._redis()
+                cached = await client.get(result_key)
+                if cached is not None:
+                    return json.loads(cached)
+                leader = await client.set(lease_key, token, nx=True, px=self.lease_seconds * 1000)
+            except RedisError as e:
+                logger.warning(f"Single-flight unavailable, running uncoalesced: {str(e)}")
+                return await fn()
+
+            if leader:
+                return await self._lead(client, lease_key, result_key, token, fn)
+
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for in-flight leader on {key}, running locally")
+                return await fn()
+
+            await asyncio.sleep(self.poll_interval)
+
+    async def _lead(self, client, lease_key: str, result_key: str, token: str, fn) -> Any:
+        heartbeat = asyncio.ensure_future(self._renew(client, lease_key, token))
+        try:
+            result = await fn()
+        except BaseException:
+            heartbeat.cancel()
+            # Let a waiting follower take over straight away
+            await self._release(client, lease_key, token)
+            raise
+        heartbeat.cancel()
+
+        try:
+            await client.set(result_key, json.dumps(result), ex=self.result_ttl)
+        except RedisError as e:
+            logger.warning(f"Could not publish single-flight result: {str(e)}")
+        await self._release(client, lease_key, token)
+        return result
+
+    async def _renew(self, client, lease_key: str, token: str) -> None:
+        """Extend the lease every third of its length until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await client.eval(_RENEW_SCRIPT, 1, lease_key, token, self.lease_seconds * 1000)
+            except RedisError as e:
+                logger.warning(f"Could not renew single-flight lease: {str(e)}")
+                continue
+            if not renewed:
+                logger.warning(f"Lost single-flight lease {lease_key}; another worker may duplicate this call")
+                return
+
+    async def _release(self, client, lease_key: str, token: str) -> None:
+        try:
+            await client.eval(_RELEASE_SCRIPT, 1, lease_key, token)
+        except RedisError as e:
+            logger.warning(f"Could not release single-flight lease: {str(e)}")
+
+    def _redis(self) -> aioredis.Redis:
+        # Connections are bound to the event loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = aioredis.Redis.from_url(self.redis_url, decode_responses=True)
+            self._client_loop = loop
+        return self._client
+
+    async def aclose(self) -> None:
+        """Close the Redis connection pool created for the current event loop"""
+        if self._client is not None and self._client_loop is asyncio.get_running_loop():
+            client = self._client
+            self._client = None
+            self._client_loop = None
+            try:
+                await client.aclose()
+            except RedisError as e:
+                logger.warning(f"Error closing single-flight Redis client: {str(e)}")
@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from celery import Celery
+from kombu import Queue
+
+from .config import settings
+from .database import SessionLocal, ContractAnalysis
+from .services.document_processor import DocumentProcessor
+from .services.ai_analyzer import AIAnalyzer
+from .services.analysis_store import AnalysisStore
+from .services.fair_scheduler import FairScheduler
+
+logger = logging.getLogger(__name__)
+
+celery_app = Celery(
+    "contract_analyzer",
+    broker=settings.CELERY_BROKER_URL,
+    backend=settings.CELERY_RESULT_BACKEND
+)
+
+celery_app.conf.update(
+    task_queues=(
+        Queue(settings.CELERY_STANDARD_QUEUE),
+        Queue(settings.CELERY_HEAVY_QUEUE),
+    ),
+    task_default_queue=settings.CELERY_STANDARD_QUEUE,
+    # One message per worker process at a time so slow jobs are not hoarded
+    worker_prefetch_multiplier=1,
+    task_acks_late=True,
+    task_ignore_result=True,
+    task_serializer="json",
+    accept_content=["json"],
+    # Jobs whose worker died are returned to the fair scheduler by the reaper
+    beat_schedule={
+        "reap-stalled-analyses": {
+            "task": "app.worker.reap_stalled_analyses",
+            "schedule": settings.CELERY_REAP_INTERVAL_SECONDS,
+            "options": {"queue": settings.CELERY_STANDARD_QUEUE},
+        },
+    },
+)
+
+# Services
+document_processor = DocumentProcessor()
+ai_analyzer = AIAnalyzer()
+analysis_store = AnalysisStore()
+scheduler = FairScheduler()
+
+def queue_for_depth(analysis_depth: str) -> str:
+    """Route slow analysis depths to their own queue"""
+    if analysis_depth in settings.CELERY_HEAVY_DEPTHS:
+        return settings.CELERY_HEAVY_QUEUE
+    return settings.CELERY_STANDARD_QUEUE
+
+def stored_upload_path(analysis_id: str, filename: str) -> str:
+    """Location of a raw upload on the shared upload volume"""
+    return os.path.join(settings.UPLOAD_DIR, f"{analysis_id}{Path(filename).suffix.lower()}")
+
+def submit_analysis(queue: str, user_id: int, analysis_id: str) -> None:
+    """Register a job with the fair scheduler and wake one worker for it"""
+    scheduler.enqueue(queue, user_id, analysis_id)
+    process_next_analysis.apply_async(args=[queue], queue=queue)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """The worker process's event loop, started on first use
+
+    Workers run with --pool=threads: prefork children are daemonic and cannot start
+    PDF extraction processes. Every task thread submits its coroutine to this one
+    loop, so the services' loop-bound clients, semaphores and extraction lanes are
+    shared by all jobs in the process, as they are in the web tier.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="worker-event-loop", daemon=True).start()
+    return _loop
+
+class _LeaseHeartbeat:
+    """Keep a claimed job's lease alive from a background thread while it runs"""
+
+    def __init__(self, queue: str, analysis_id: str):
+        self.queue = queue
+        self.analysis_id = analysis_id
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(settings.CELERY_JOB_HEARTBEAT_SECONDS):
+            try:
+                if not scheduler.heartbeat(self.queue, self.analysis_id):
+                    logger.warning(f"Lease on analysis {self.analysis_id} expired while it was running")
+            except Exception as e:
+                logger.warning(f"Heartbeat for analysis {self.analysis_id} failed: {str(e)}")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+@celery_app.task(name="app.worker.process_next_analysis")
+def process_next_analysis(queue: str) -> Optional[str]:
+    """Run the next fairly-scheduled analysis from the queue"""
+    analysis_id = scheduler.next_job(queue)
+    if not analysis_id:
+        return None
+
+    started = time.perf_counter()
+    try:
+        with _LeaseHeartbeat(queue, analysis_id):
+            _run_job(analysis_id)
+    finally:
+        scheduler.ack(queue, analysis_id)
+    # Feeds the web tier's queue-wait estimate for admission control
+    try:
+        scheduler.record_service_time(queue, time.perf_counter() - started, settings.ADMISSION_EWMA_ALPHA)
+    except Exception as e:
+        logger.warning(f"Could not record service time for {queue}: {str(e)}")
+    return analysis_id
+
+@celery_app.task(name="app.worker.reap_stalled_analyses")
+def reap_stalled_analyses() -> None:
+    """Requeue analyses whose worker died, and fail ones that keep killing workers"""
+    for queue in (settings.CELERY_STANDARD_QUEUE, settings.CELERY_HEAVY_QUEUE):
+        requeued, abandoned = scheduler.reap(queue)
+        for analysis_id in requeued:
+            logger.warning(f"Requeued analysis {analysis_id} after its worker stopped responding")
+            process_next_analysis.apply_async(args=[queue], queue=queue)
+        for analysis_id in abandoned:
+            logger.error(f"Giving up on analysis {analysis_id} after {settings.CELERY_JOB_MAX_ATTEMPTS} attempts")
+            _fail_job(analysis_id, "Analysis did not complete after repeated worker failures")
+
+def _run_job(analysis_id: str) -> None:
+    db = SessionLocal()
+    try:
+        row = db.query(ContractAnalysis).filter(ContractAnalysis.id == analysis_id).first()
+        if row is None:
+            logger.warning(f"Analysis {analysis_id} no longer exists, skipping")
+            return
+        if row.status not in ("queued", "processing"):
+            # e.g. failed at upload time after it had already been enqueued
+            logger.warning(f"Analysis {analysis_id} is {row.status}, skipping")
+            return
+
+        # Copy what the job needs before committing: touching row afterwards would
+        # reload it and leave the connection idle in transaction during analysis
+        stored_path = row.stored_path
+        filename = row.filename
+        contract_type = row.contract_type
+        analysis_depth = row.analysis_depth
+        row.status = "processing"
+        db.commit()
+
+        try:
+            with open(stored_path, "rb") as f:
+                content = f.read()
+            result = asyncio.run_coroutine_threadsafe(
+                _analyze(analysis_id, filename, contract_type, analysis_depth, content),
+                _event_loop()
+            ).result()
+            analysis_store.save_result(db, row, result)
+        except Exception as e:
+            logger.error(f"Worker failed on analysis {analysis_id}: {str(e)}")
+            analysis_store.mark_failed(db, row, str(e))
+        finally:
+            remove_stored_upload(stored_path)
+    finally:
+        db.close()
+
+def _fail_job(analysis_id: str, error: str) -> None:
+    db = SessionLocal()
+    try:
+        row = db.query(ContractAnalysis).filter(ContractAnalysis.id == analysis_id).first()
+        if row is None:
+            return
+        analysis_store.mark_failed(db, row, error)
+        remove_stored_upload(row.stored_path)
+    finally:
+        db.close()
+
+async def _analyze(analysis_id: str, filename: str, contract_type: str, analysis_depth: str, content: bytes):
+    document = await document_processor.extract_document(content, filename)
+    result = await ai_analyzer.analyze_contract(
+        text=document.text,
+        contract_type=contract_type,
+        analysis_depth=analysis_depth,
+        filename=filename
+    )
+    result = document_processor.annotate_locations(result, document)
+    # Keep the ID handed out at upload time
+    return result.model_copy(update={"id": analysis_id})
+
+def remove_stored_upload(path: Optional[str]) -> None:
+    """Delete a raw upload once it has been processed or abandoned"""
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove processed upload {path}: {str(e)}")
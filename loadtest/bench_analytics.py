@@ -0,0 +1,118 @@
+"""Portfolio risk analytics latency on a synthetic portfolio
+
+Fills a throwaway SQLite database with one user's analyses, then times
+RiskAnalytics.summarize() with empty caches for a few typical filters. Exits
+non-zero if the unfiltered summary misses the target.
+
+    python -m loadtest.bench_analytics --risks 1000000 --target-ms 1000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+CONTRACT_TYPES = ["nda", "employment", "service", "partnership", "lease", "purchase"]
+USER_ID = 1
+
+def populate(risks: int, per_analysis: int, type_count: int, seed: int) -> None:
+    import numpy as np
+    from app.database import Base, SessionLocal, RiskVector, engine
+    from app.services import risk_analytics as analytics
+
+    Base.metadata.create_all(engine)
+    rng = np.random.default_rng(seed)
+    random.seed(seed)
+    with SessionLocal() as db:
+        type_codes = analytics.risk_analytics.codes.encode(db, analytics.KIND_RISK_TYPE, [f"risk type {i}" for i in range(type_count)])
+        contract_codes = analytics.risk_analytics.codes.encode(db, analytics.KIND_CONTRACT_TYPE, CONTRACT_TYPES)
+        db.commit()
+    type_pool = np.array(list(type_codes.values()), dtype=np.int32)
+    contract_pool = list(contract_codes.values())
+
+    # Vectors are written as analyses complete, so rows arrive in time order
+    start = analytics.epoch_seconds(datetime(2025, 1, 1))
+    analyses = risks // per_analysis
+    completed = sorted(start + random.randint(0, 365 * 86400) for _ in range(analyses))
+    rows = []
+    for index, created in enumerate(completed):
+        contract_code = random.choice(contract_pool)
+        packed = np.zeros(per_analysis, dtype=analytics.RISK_DTYPE)
+        packed["severity"] = rng.integers(0, 4, per_analysis)
+        packed["type"] = rng.choice(type_pool, per_analysis)
+        packed["confidence"] = rng.random(per_analysis)
+        packed["contract_type"] = contract_code
+        packed["created_at"] = created
+        packed["compliance_score"] = random.uniform(0, 100)
+        packed["overall_risk_score"] = random.uniform(0, 10)
+        rows.append({
+            "analysis_id": f"{index:032x}",
+            "user_id": USER_ID,
+            "contract_type_code": contract_code,
+            "created_epoch": created,
+            "risk_count": per_analysis,
+            "risks": packed.tobytes(),
+        })
+    with engine.begin() as connection:
+        connection.execute(RiskVector.__table__.insert(), rows)
+
+def bench(repeat: int) -> dict:
+    from app.database import SessionLocal
+    from app.services.risk_analytics import RiskAnalytics, RiskFilter
+
+    filters = {
+        "all": dict(),
+        "risk_type": dict(risk_type="risk type 7"),
+        "contract_type_high": dict(contract_type="service", min_severity="high"),
+        "last_quarter": dict(start=datetime(2025, 10, 1), bucket="day"),
+    }
+    report = {}
+    for name, kwargs in filters.items():
+        timings = []
+        for _ in range(repeat):
+            analytics = RiskAnalytics()  # empty result and code caches
+            with SessionLocal() as db:
+                started = time.perf_counter()
+                summary = analytics.summarize(db, RiskFilter(USER_ID, **kwargs))
+                timings.append((time.perf_counter() - started) * 1000)
+        report[name] = {
+            "median_ms": round(statistics.median(timings), 1),
+            "max_ms": round(max(timings), 1),
+            "total_risks": summary["total_risks"],
+            "total_analyses": summary["total_analyses"],
+        }
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Portfolio risk analytics benchmark")
+    parser.add_argument("--risks", type=int, default=1_000_000)
+    parser.add_argument("--risks-per-analysis", type=int, default=8)
+    parser.add_argument("--types", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--target-ms", type=float, default=1000.0)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="bench-analytics-") as workdir:
+        # Must be set before app.database creates its engine
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'analytics.db')}"
+        os.environ["UPLOAD_DIR"] = workdir
+
+        started = time.perf_counter()
+        populate(args.risks, args.risks_per_analysis, args.types, args.seed)
+        print(f"Loaded {args.risks} risks in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        report = bench(args.repeat)
+    print(json.dumps(report, indent=2))
+
+    if report["all"]["median_ms"] > args.target_ms:
+        print(f"FAIL: unfiltered summary took {report['all']['median_ms']}ms, target {args.target_ms}ms", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
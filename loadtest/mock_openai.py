@@ -0,0 +1,243 @@
+"""Mock OpenAI chat-completions server for load testing
+
+Serves POST /v1/chat/completions with configurable latency, 429/5xx injection,
+optional SSE streaming and canned bodies that exercise every branch of
+AIAnalyzer._parse_ai_response, including the fallback path. Triage prompts get a
+canned risk level instead.
+
+    python -m loadtest.mock_openai --port 8900 --latency-ms 800 --error-429 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import uuid
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+VALID_ANALYSIS = {
+    "summary": "Mutual services agreement with standard commercial terms.",
+    "key_terms": [
+        {"term": "Term", "value": "24 months", "importance": "high"},
+        {"term": "Payment", "value": "Net 30", "importance": "medium"},
+    ],
+    "risks": [
+        {
+            "type": "Liability",
+            "severity": "medium",
+            "description": "Liability cap excludes indirect damages only.",
+            "recommendation": "Cap total liability at fees paid.",
+            "confidence": 0.82,
+            "location": "Section 9.2",
+        },
+        {
+            "type": "Termination",
+            "severity": "low",
+            "description": "Either party may terminate on 30 days notice.",
+            "recommendation": "Add a wind-down period.",
+            "confidence": 0.9,
+            "location": "Section 12.1",
+        },
+    ],
+    "insights": [
+        {
+            "category": "Negotiation",
+            "title": "Payment terms",
+            "description": "Net 30 is market standard.",
+            "impact": "Neutral",
+            "recommendation": "Accept as drafted.",
+        }
+    ],
+    "compliance_score": 0.78,
+    "overall_risk_score": 0.35,
+    "negotiation_points": ["Liability cap"],
+    "missing_clauses": ["Data protection"],
+    "improvements": ["Define service levels"],
+}
+
+HIGH_RISK_ANALYSIS = dict(
+    VALID_ANALYSIS,
+    risks=[
+        dict(VALID_ANALYSIS["risks"][0], type="Indemnification", severity="critical", confidence=0.55),
+    ],
+    overall_risk_score=0.85,
+)
+
+# name -> content; weights are set from the command line
+CANNED_BODIES = {
+    "valid": json.dumps(VALID_ANALYSIS),
+    "high_risk": json.dumps(HIGH_RISK_ANALYSIS),
+    "wrapped": "Here is the analysis you asked for:\n" + json.dumps(VALID_ANALYSIS) + "\nLet me know if you need more.",
+    "malformed": json.dumps(VALID_ANALYSIS)[:-40],
+    "no_json": "I'm sorry, I cannot analyze this document.",
+}
+
+# A triage reply is a few dozen tokens against ~1,500 for a full analysis, so it
+# costs little more than time to first token
+TRIAGE_LATENCY_FRACTION = 0.15
+
+class MockConfig:
+    def __init__(self, args: argparse.Namespace):
+        self.latency_ms = args.latency_ms
+        self.latency_sigma = args.latency_sigma
+        self.error_429 = args.error_429
+        self.error_5xx = args.error_5xx
+        self.stream_chunk_chars = args.stream_chunk_chars
+        self.bodies = list(CANNED_BODIES)
+        self.weights = [
+            args.weight_valid,
+            args.weight_high_risk,
+            args.weight_wrapped,
+            args.weight_malformed,
+            args.weight_no_json,
+        ]
+
+    def latency(self) -> float:
+        """Lognormal latency in seconds with the configured median"""
+        if self.latency_ms <= 0:
+            return 0.0
+        return self.latency_ms / 1000 * random.lognormvariate(0, self.latency_sigma)
+
+    def pick_body(self) -> str:
+        return CANNED_BODIES[random.choices(self.bodies, weights=self.weights)[0]]
+
+    def pick_triage(self) -> str:
+        """Triage verdict, flagging contracts as often as high-risk bodies are served"""
+        high = random.choices(self.bodies, weights=self.weights)[0] == "high_risk"
+        return json.dumps({"risk_level": "high" if high else "low", "reason": "Canned triage verdict."})
+
+class PromptCache:
+    """Approximates OpenAI prompt caching so cache-hit metrics mean something
+
+    Only prefixes of at least 1024 tokens are cached, in 128-token steps, and a
+    prefix is a hit only if an earlier request started with exactly the same text.
+    Tokens are approximated as 4 characters.
+    """
+
+    MIN_TOKENS = 1024
+    STEP_TOKENS = 128
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._seen = set()
+
+    def lookup(self, prompt: str) -> int:
+        """Cached token count for this prompt, then remember its prefixes"""
+        cached = 0
+        tokens = self.MIN_TOKENS
+        while tokens * self.CHARS_PER_TOKEN <= len(prompt):
+            digest = hash(prompt[:tokens * self.CHARS_PER_TOKEN])
+            if digest in self._seen:
+                cached = tokens
+            else:
+                if len(self._seen) >= self.max_entries:
+                    self._seen.clear()
+                self._seen.add(digest)
+            tokens += self.STEP_TOKENS
+        return cached
+
+def create_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock OpenAI")
+    prompt_cache = PromptCache()
+    stats = {"requests": 0, "429": 0, "5xx": 0}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        stats["requests"] += 1
+        messages = payload.get("messages", [])
+        system = messages[0].get("content", "") if messages else ""
+        triage = '"risk_level"' in system
+        await asyncio.sleep(config.latency() * (TRIAGE_LATENCY_FRACTION if triage else 1))
+
+        roll = random.random()
+        if roll < config.error_429:
+            stats["429"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": "1"},
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+        if roll < config.error_429 + config.error_5xx:
+            stats["5xx"] += 1
+            return JSONResponse(
+                status_code=random.choice([500, 502, 503]),
+                content={"error": {"message": "The server had an error", "type": "server_error"}},
+            )
+
+        model = payload.get("model", "gpt-4")
+        content = config.pick_triage() if triage else config.pick_body()
+        prompt_tokens = sum(len(message.get("content", "")) for message in messages) // 4 + 1
+        completion_tokens = len(content) // 4 + 1
+        cached_tokens = prompt_cache.lookup("".join(message.get("content", "") for message in messages))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached_tokens},
+        }
+
+        if payload.get("stream"):
+            return StreamingResponse(_stream(model, content, config.stream_chunk_chars), media_type="text/event-stream")
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+async def _stream(model: str, content: str, chunk_chars: int):
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    for start in range(0, len(content), chunk_chars):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": {"content": content[start:start + chunk_chars]}, "finish_reason": None}],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(0)
+    done = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": created,
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(done)}\n\n"
+    yield "data: [DONE]\n\n"
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=float, default=800, help="median response latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="lognormal spread")
+    parser.add_argument("--error-429", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--error-5xx", type=float, default=0.0, help="fraction of requests answered with 5xx")
+    parser.add_argument("--stream-chunk-chars", type=int, default=64)
+    parser.add_argument("--weight-valid", type=float, default=0.7)
+    parser.add_argument("--weight-high-risk", type=float, default=0.1)
+    parser.add_argument("--weight-wrapped", type=float, default=0.1)
+    parser.add_argument("--weight-malformed", type=float, default=0.05)
+    parser.add_argument("--weight-no-json", type=float, default=0.05)
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    uvicorn.run(create_app(MockConfig(args)), host=args.host, port=args.port, log_level="warning")
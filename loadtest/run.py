@@ -0,0 +1,320 @@
+"""End-to-end load test for the Contract Analyzer API
+
+Starts the mock OpenAI server and the app (unless --target is given), runs the
+selected scenarios, prints throughput, latency percentiles, error rates and peak
+RSS, and exits non-zero if any scenario regresses against loadtest/baselines.json.
+
+    python -m loadtest.run                       # all scenarios
+    python -m loadtest.run --scenario mixed --duration 60
+    python -m loadtest.run --update-baseline     # record current numbers
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+BASELINE_PATH = Path(__file__).with_name("baselines.json")
+ERROR_RATE_SLACK = 0.02  # absolute, error rates are noisy at low volume
+DEMO_EMAIL = "suyash@lawfirm.com"
+DEMO_PASSWORD = "demo123"
+
+CLAUSES = [
+    "The Provider shall perform the Services in a professional and workmanlike manner.",
+    "Either party may terminate this Agreement upon thirty (30) days written notice.",
+    "The Client shall indemnify the Provider against all claims arising from the Client's use of the Deliverables.",
+    "Neither party shall be liable for indirect, incidental or consequential damages.",
+    "All invoices are payable within thirty (30) days of receipt.",
+    "Each party shall keep the other party's Confidential Information strictly confidential.",
+]
+
+def make_contract(size_bytes: int) -> bytes:
+    """Synthetic plain-text contract of roughly the given size"""
+    lines = []
+    total = 0
+    section = 1
+    while total < size_bytes:
+        line = f"{section}. {random.choice(CLAUSES)}\n"
+        lines.append(line)
+        total += len(line)
+        section += 1
+    return "".join(lines).encode("utf-8")
+
+class Recorder:
+    """Latency and error counts for one scenario"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.requests = 0
+        self.http_errors = 0
+        self.file_results = 0
+        self.file_errors = 0
+        self.peak_rss_mb: Optional[float] = None
+
+    def record(self, latency: float, response: Optional[httpx.Response]) -> None:
+        self.requests += 1
+        self.latencies.append(latency)
+        if response is None or response.status_code >= 400:
+            self.http_errors += 1
+            return
+        if response.request.url.path == "/api/upload":
+            for result in response.json().get("results", []):
+                self.file_results += 1
+                if result.get("status") == "error":
+                    self.file_errors += 1
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        ordered = sorted(self.latencies)
+
+        def percentile(pct: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))] * 1000
+
+        return {
+            "requests": self.requests,
+            "throughput_rps": round(self.requests / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(50), 1),
+            "p95_ms": round(percentile(95), 1),
+            "p99_ms": round(percentile(99), 1),
+            "http_error_rate": round(self.http_errors / self.requests, 4) if self.requests else 0.0,
+            "file_error_rate": round(self.file_errors / self.file_results, 4) if self.file_results else 0.0,
+            "peak_rss_mb": self.peak_rss_mb,
+        }
+
+async def _timed(recorder: Recorder, request) -> None:
+    started = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError:
+        response = None
+    recorder.record(time.perf_counter() - started, response)
+
+async def _upload(client: httpx.AsyncClient, token: str, files: List[Tuple[str, bytes, str]], depth: str = "standard"):
+    return await client.post(
+        "/api/upload",
+        params={"contract_type": random.choice(["service", "nda", "employment", "general"]), "analysis_depth": depth},
+        files=[("files", file) for file in files],
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+# Scenarios: each worker loops until the deadline
+
+async def scenario_large_file(client, token, recorder, deadline, pdf: Optional[bytes] = None):
+    if pdf is not None:
+        files = [("contract.pdf", pdf, "application/pdf")]
+    else:
+        files = [("contract.txt", make_contract(5 * 1024 * 1024), "text/plain")]
+    while time.monotonic() < deadline:
+        await _timed(recorder, _upload(client, token, files))
+
+async def scenario_many_small(client, token, recorder, deadline, pdf: Optional[bytes] = None):
+    files = [(f"contract-{i}.txt", make_contract(8 * 1024), "text/plain") for i in range(20)]
+    while time.monotonic() < deadline:
+        await _timed(recorder, _upload(client, token, files))
+
+async def scenario_mixed(client, token, recorder, deadline, pdf: Optional[bytes] = None):
+    headers = {"Authorization": f"Bearer {token}"}
+    small = [("contract.txt", make_contract(16 * 1024), "text/plain")]
+    while time.monotonic() < deadline:
+        roll = random.random()
+        if roll < 0.2:
+            request = client.post("/api/auth/login", json={"email": DEMO_EMAIL, "password": DEMO_PASSWORD})
+        elif roll < 0.6:
+            request = client.get("/api/dashboard/stats", headers=headers)
+        elif roll < 0.7:
+            request = client.get("/api/health")
+        else:
+            request = _upload(client, token, small, depth=random.choice(["standard", "deep", "risk_assessment"]))
+        await _timed(recorder, request)
+
+SCENARIOS = {
+    "large_file": (scenario_large_file, 4),
+    "many_small": (scenario_many_small, 8),
+    "mixed": (scenario_mixed, 32),
+}
+
+def read_rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+async def _watch_rss(pid: int, recorder: Recorder, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        rss = read_rss_mb(pid)
+        if rss is not None:
+            recorder.peak_rss_mb = round(max(recorder.peak_rss_mb or 0.0, rss), 1)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=0.5)
+        except asyncio.TimeoutError:
+            pass
+
+async def run_scenario(
+    name: str,
+    target: str,
+    duration: float,
+    concurrency: Optional[int],
+    app_pid: Optional[int],
+    pdf: Optional[bytes] = None
+):
+    worker, default_concurrency = SCENARIOS[name]
+    concurrency = concurrency or default_concurrency
+    recorder = Recorder()
+
+    async with httpx.AsyncClient(base_url=target, timeout=120) as client:
+        login = await client.post("/api/auth/login", json={"email": DEMO_EMAIL, "password": DEMO_PASSWORD})
+        login.raise_for_status()
+        token = login.json()["access_token"]
+
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(_watch_rss(app_pid, recorder, stop)) if app_pid else None
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(worker(client, token, recorder, deadline, pdf) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+        stop.set()
+        if watcher:
+            await watcher
+
+    return recorder.summary(elapsed)
+
+async def fetch_extraction_stats(target: str) -> Dict:
+    async with httpx.AsyncClient(base_url=target, timeout=30) as client:
+        login = await client.post("/api/auth/login", json={"email": DEMO_EMAIL, "password": DEMO_PASSWORD})
+        login.raise_for_status()
+        response = await client.get(
+            "/api/metrics/extraction",
+            headers={"Authorization": f"Bearer {login.json()['access_token']}"}
+        )
+        response.raise_for_status()
+        return response.json()
+
+def check_regressions(results: Dict[str, Dict], baselines: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Compare results with stored baselines, allowing `tolerance` relative slack"""
+    failures = []
+    for name, result in results.items():
+        baseline = baselines.get(name)
+        if not baseline:
+            failures.append(f"{name}: no baseline stored; run with --update-baseline to record one")
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "peak_rss_mb"):
+            if baseline.get(metric) and result.get(metric) and result[metric] > baseline[metric] * (1 + tolerance):
+                failures.append(f"{name}: {metric} {result[metric]} > baseline {baseline[metric]}")
+        if baseline.get("throughput_rps") and result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+            failures.append(f"{name}: throughput_rps {result['throughput_rps']} < baseline {baseline['throughput_rps']}")
+        for metric in ("http_error_rate", "file_error_rate"):
+            if result[metric] > baseline.get(metric, 0.0) + ERROR_RATE_SLACK:
+                failures.append(f"{name}: {metric} {result[metric]} > baseline {baseline.get(metric, 0.0)}")
+    return failures
+
+def _wait_for(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+def start_stack(args: argparse.Namespace, workdir: str):
+    """Launch the mock OpenAI server and the app against it"""
+    mock = subprocess.Popen(
+        [sys.executable, "-m", "loadtest.mock_openai", "--port", str(args.mock_port)] + args.mock_args
+    )
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="mock",
+        OPENAI_API_BASE=f"http://127.0.0.1:{args.mock_port}/v1",
+        DATABASE_URL=f"sqlite:///{workdir}/loadtest.db",
+        # Keep runs out of the checkout; a cache carried over between runs turns
+        # repeated uploads into hits and skews throughput and latency
+        UPLOAD_DIR=workdir,
+        EXTRACTION_CACHE_DIR=os.path.join(workdir, "extraction_cache"),
+        PROFILER_DIR=os.path.join(workdir, "profiles"),
+        CELERY_ENABLED="false",
+        COALESCE_ENABLED="false",
+        LOG_LEVEL="WARNING",
+    )
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.app_port), "--log-level", "warning"],
+        env=env,
+    )
+    _wait_for(f"http://127.0.0.1:{args.mock_port}/stats")
+    _wait_for(f"http://127.0.0.1:{args.app_port}/api/health")
+    return mock, app
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Contract Analyzer load test")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="repeatable; default all")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, help="override per-scenario concurrency")
+    parser.add_argument("--target", help="existing deployment to test instead of a local stack")
+    parser.add_argument("--app-pid", type=int, help="app process to sample RSS from when using --target")
+    parser.add_argument("--app-port", type=int, default=8800)
+    parser.add_argument("--mock-port", type=int, default=8900)
+    parser.add_argument("--mock-args", nargs=argparse.REMAINDER, default=[], help="passed to loadtest.mock_openai")
+    parser.add_argument("--pdf", help="PDF to upload in the large_file scenario instead of synthetic text")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    scenarios = args.scenario or list(SCENARIOS)
+    pdf = Path(args.pdf).read_bytes() if args.pdf else None
+    processes = []
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            if args.target:
+                target, app_pid = args.target, args.app_pid
+            else:
+                processes = list(start_stack(args, workdir))
+                target, app_pid = f"http://127.0.0.1:{args.app_port}", processes[1].pid
+
+            results = {}
+            for name in scenarios:
+                print(f"Running {name} for {args.duration:.0f}s...", flush=True)
+                results[name] = asyncio.run(run_scenario(name, target, args.duration, args.concurrency, app_pid, pdf))
+                print(json.dumps(results[name], indent=2), flush=True)
+
+            try:
+                extraction = asyncio.run(fetch_extraction_stats(target))
+                print("PDF extraction throughput by backend:")
+                print(json.dumps(extraction, indent=2), flush=True)
+            except httpx.HTTPError as e:
+                print(f"Could not fetch extraction stats: {str(e)}")
+        finally:
+            for process in processes:
+                process.terminate()
+                process.wait()
+
+    if args.update_baseline:
+        baselines = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else {}
+        baselines.update(results)
+        BASELINE_PATH.write_text(json.dumps(baselines, indent=2) + "\n")
+        print(f"Baselines written to {BASELINE_PATH}")
+        return 0
+
+    if not BASELINE_PATH.exists():
+        print(f"No baselines at {BASELINE_PATH}; run with --update-baseline to record them")
+        return 1
+
+    failures = check_regressions(results, json.loads(BASELINE_PATH.read_text()), args.tolerance)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+import fakeredis
+import fakeredis.aioredis
+import pytest
+import redis
+import redis.asyncio as aioredis
+
+@pytest.fixture
+def redis_server(monkeypatch):
+    """One in-memory Redis server shared by every client the services create"""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        redis.Redis, "from_url",
+        lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)
+    )
+    monkeypatch.setattr(
+        aioredis.Redis, "from_url",
+        lambda url, **kwargs: fakeredis.aioredis.FakeRedis(server=server, **kwargs)
+    )
+    return server
@@ -0,0 +1,87 @@
+import pytest
+
+from app.config import settings
+from app.services.fair_scheduler import FairScheduler
+
+QUEUE = "analysis_standard"
+
+@pytest.fixture
+def scheduler(redis_server):
+    return FairScheduler()
+
+def drain(scheduler):
+    jobs = []
+    while True:
+        job = scheduler.next_job(QUEUE)
+        if job is None:
+            return jobs
+        scheduler.ack(QUEUE, job)
+        jobs.append(job)
+
+def test_enqueue_returns_user_backlog(scheduler):
+    assert scheduler.enqueue(QUEUE, 1, "a1") == 1
+    assert scheduler.enqueue(QUEUE, 1, "a2") == 2
+    assert scheduler.enqueue(QUEUE, 2, "b1") == 1
+
+def test_dequeue_round_robins_across_users(scheduler):
+    for i in range(1, 5):
+        scheduler.enqueue(QUEUE, 1, f"a{i}")
+    scheduler.enqueue(QUEUE, 2, "b1")
+    scheduler.enqueue(QUEUE, 2, "b2")
+    scheduler.enqueue(QUEUE, 3, "c1")
+
+    assert drain(scheduler) == ["a1", "b1", "c1", "a2", "b2", "a3", "a4"]
+
+def test_user_rejoins_ring_at_the_back(scheduler):
+    scheduler.enqueue(QUEUE, 1, "a1")
+    scheduler.enqueue(QUEUE, 2, "b1")
+    assert scheduler.next_job(QUEUE) == "a1"
+    # User 1 left the ring when their list emptied, so they queue behind user 2
+    scheduler.enqueue(QUEUE, 1, "a2")
+
+    assert [scheduler.next_job(QUEUE), scheduler.next_job(QUEUE)] == ["b1", "a2"]
+    assert scheduler.next_job(QUEUE) is None
+
+def test_backlog_counts_pending_per_user_and_running(scheduler):
+    scheduler.enqueue(QUEUE, 1, "a1")
+    scheduler.enqueue(QUEUE, 1, "a2")
+    scheduler.enqueue(QUEUE, 2, "b1")
+    scheduler.next_job(QUEUE)
+
+    assert scheduler.backlog(QUEUE) == ({"1": 1, "2": 1}, 1)
+
+def test_reap_requeues_expired_lease_at_front_of_user_list(scheduler, monkeypatch):
+    scheduler.enqueue(QUEUE, 1, "a1")
+    scheduler.enqueue(QUEUE, 1, "a2")
+    monkeypatch.setattr(settings, "CELERY_JOB_LEASE_SECONDS", 0)
+    assert scheduler.next_job(QUEUE) == "a1"
+
+    assert scheduler.reap(QUEUE) == (["a1"], [])
+    assert scheduler.backlog(QUEUE) == ({"1": 2}, 0)
+    assert scheduler.next_job(QUEUE) == "a1"
+
+def test_reap_leaves_live_leases_alone(scheduler):
+    scheduler.enqueue(QUEUE, 1, "a1")
+    assert scheduler.next_job(QUEUE) == "a1"
+
+    assert scheduler.reap(QUEUE) == ([], [])
+    assert scheduler.heartbeat(QUEUE, "a1")
+
+def test_reap_abandons_job_after_max_attempts(scheduler, monkeypatch):
+    monkeypatch.setattr(settings, "CELERY_JOB_LEASE_SECONDS", 0)
+    monkeypatch.setattr(settings, "CELERY_JOB_MAX_ATTEMPTS", 2)
+    scheduler.enqueue(QUEUE, 1, "a1")
+
+    assert scheduler.next_job(QUEUE) == "a1"
+    assert scheduler.reap(QUEUE) == (["a1"], [])
+    assert scheduler.next_job(QUEUE) == "a1"
+    assert scheduler.reap(QUEUE) == ([], ["a1"])
+    assert scheduler.next_job(QUEUE) is None
+
+def test_heartbeat_fails_once_lease_is_reaped(scheduler, monkeypatch):
+    monkeypatch.setattr(settings, "CELERY_JOB_LEASE_SECONDS", 0)
+    scheduler.enqueue(QUEUE, 1, "a1")
+    scheduler.next_job(QUEUE)
+    scheduler.reap(QUEUE)
+
+    assert not scheduler.heartbeat(QUEUE, "a1")
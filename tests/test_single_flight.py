@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+KEY = "contract"
+
+def make_single_flight(**kwargs):
+    options = dict(lease_seconds=1, wait_seconds=10, result_ttl=60, poll_interval=0.05)
+    options.update(kwargs)
+    return SingleFlight(redis_url="redis://test", **options)
+
+def test_concurrent_callers_in_one_process_share_a_call(redis_server):
+    single_flight = make_single_flight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.1)
+        return {"summary": "ok"}
+
+    async def main():
+        return await asyncio.gather(*(single_flight.run(KEY, work) for _ in range(3)))
+
+    assert asyncio.run(main()) == [{"summary": "ok"}] * 3
+    assert len(calls) == 1
+
+def test_follower_in_another_worker_gets_leader_result(redis_server):
+    leader, follower = make_single_flight(), make_single_flight()
+    calls = []
+
+    async def work(name):
+        calls.append(name)
+        await asyncio.sleep(0.2)
+        return {"by": name}
+
+    async def main():
+        first = asyncio.ensure_future(leader.run(KEY, lambda: work("leader")))
+        await asyncio.sleep(0.05)
+        second = await follower.run(KEY, lambda: work("follower"))
+        return await first, second
+
+    assert asyncio.run(main()) == ({"by": "leader"}, {"by": "leader"})
+    assert calls == ["leader"]
+
+def test_follower_takes_over_when_leader_fails(redis_server):
+    leader, follower = make_single_flight(), make_single_flight()
+
+    async def failing():
+        await asyncio.sleep(0.1)
+        raise RuntimeError("model unavailable")
+
+    async def work():
+        return {"by": "follower"}
+
+    async def main():
+        first = asyncio.ensure_future(leader.run(KEY, failing))
+        await asyncio.sleep(0.02)
+        started = asyncio.get_running_loop().time()
+        second = await follower.run(KEY, work)
+        with pytest.raises(RuntimeError):
+            await first
+        return second, asyncio.get_running_loop().time() - started
+
+    result, waited = asyncio.run(main())
+    assert result == {"by": "follower"}
+    # The failed leader released its lease rather than leaving it to expire
+    assert waited < 0.5
+
+def test_follower_takes_over_when_leader_dies(redis_server):
+    follower = make_single_flight()
+    # A leader that crashed holding the lease: it never renews or releases it
+    dead = make_single_flight()
+
+    async def work():
+        return {"by": "follower"}
+
+    async def main():
+        await dead._redis().set(f"{dead.prefix}:lease:{KEY}", "dead-leader", px=300)
+        started = asyncio.get_running_loop().time()
+        result = await follower.run(KEY, work)
+        return result, asyncio.get_running_loop().time() - started
+
+    result, waited = asyncio.run(main())
+    assert result == {"by": "follower"}
+    assert 0.2 <= waited < 2
+
+def test_leader_renews_lease_while_working(redis_server):
+    leader, follower = make_single_flight(), make_single_flight()
+    calls = []
+
+    async def slow(name):
+        calls.append(name)
+        # Outlives several lease lengths
+        await asyncio.sleep(2.5)
+        return {"by": name}
+
+    async def main():
+        first = asyncio.ensure_future(leader.run(KEY, lambda: slow("leader")))
+        await asyncio.sleep(0.05)
+        second = await follower.run(KEY, lambda: slow("follower"))
+        return await first, second
+
+    assert asyncio.run(main()) == ({"by": "leader"}, {"by": "leader"})
+    assert calls == ["leader"]
@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import pytest
+
+from app.config import settings
+from app.services.ai_analyzer import AIAnalyzer
+from app.utils.exceptions import AIAnalysisException
+
+ANALYSIS = {
+    "summary": "Services agreement.",
+    "risks": [
+        {"type": "Payment", "severity": "low", "description": "Net 60.", "recommendation": "Ask for net 30.", "confidence": 0.9}
+    ],
+    "compliance_score": 0.8,
+    "overall_risk_score": 0.2,
+}
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_ROUTING_ENABLED", True)
+    monkeypatch.setattr(settings, "TRIAGE_ENABLED", True)
+    return AIAnalyzer()
+
+def fake_calls(monkeypatch, analyzer, triage):
+    """Stub the OpenAI call, returning the given triage reply; logs (route, model)"""
+    calls = []
+
+    async def call_openai(messages, model=None, route="default", timeout=None):
+        calls.append((route, model))
+        if route == "triage":
+            if isinstance(triage, Exception):
+                raise triage
+            return triage
+        return json.dumps(ANALYSIS)
+
+    monkeypatch.setattr(analyzer, "_call_openai", call_openai)
+    return calls
+
+def run(analyzer):
+    return asyncio.run(analyzer._run_analysis("This agreement " * 100, "service", "standard", "msa.pdf"))
+
+def test_low_risk_triage_keeps_fast_model(monkeypatch, analyzer):
+    calls = fake_calls(monkeypatch, analyzer, '{"risk_level": "low", "reason": "standard terms"}')
+    run(analyzer)
+    assert calls == [("triage", settings.OPENAI_FAST_MODEL), ("fast:standard", settings.OPENAI_FAST_MODEL)]
+
+def test_high_risk_triage_goes_straight_to_large_model(monkeypatch, analyzer):
+    calls = fake_calls(monkeypatch, analyzer, '{"risk_level": "high", "reason": "uncapped indemnity"}')
+    run(analyzer)
+    assert calls == [("triage", settings.OPENAI_FAST_MODEL), ("triaged:standard", settings.OPENAI_MODEL)]
+
+@pytest.mark.parametrize("reply", [
+    "not json",
+    '{"risk_level": "severe"}',
+    AIAnalysisException("AI service unavailable", status_code=503),
+])
+def test_unusable_triage_falls_back_to_fast_model(monkeypatch, analyzer, reply):
+    calls = fake_calls(monkeypatch, analyzer, reply)
+    run(analyzer)
+    assert calls[-1] == ("fast:standard", settings.OPENAI_FAST_MODEL)
+
+def test_large_routes_skip_triage(monkeypatch, analyzer):
+    calls = fake_calls(monkeypatch, analyzer, '{"risk_level": "low"}')
+    asyncio.run(analyzer._run_analysis("This agreement " * 100, "service", "deep", "msa.pdf"))
+    assert calls == [("large:deep", settings.OPENAI_MODEL)]